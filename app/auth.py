@@ -3,29 +3,68 @@ This module contains authentication
 """
 
 from typing import Annotated
+from decouple import config, Csv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, event
 from app.models import User
-from app.database import get_db
+from app.database import get_db_read, is_replica, SessionLocal
 from app.security import verify_token
+from app.schemas import UserSnapshot
+from app.cache import TTLCache
+from app.metrics import CacheCollector, register_process_collector
 
 auth_scheme = HTTPBearer()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+AUTH_CACHE_SIZE = config("AUTH_CACHE_SIZE", default=10000, cast=int)
+AUTH_CACHE_TTL_SECONDS = config("AUTH_CACHE_TTL_SECONDS", default=60, cast=int)
+# Comma-separated emails allowed to use admin features (e.g. job profiling)
+ADMIN_EMAILS = {
+    email.lower() for email in config("ADMIN_EMAILS", default="", cast=Csv())
+}
 
-async def get_current_user(
-    token: str = Depends(auth_scheme), db: AsyncSession = Depends(get_db)
-):
+# token -> (TokenData, UserSnapshot); entries never outlive the token's exp
+token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+register_process_collector(CacheCollector("auth_token_cache", token_cache))
+
+
+def invalidate_user(user_id: int) -> int:
+    """Drop every cached token of a user (e.g. after deactivation)."""
+    return token_cache.invalidate_where(lambda entry: entry[1].id == user_id)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_deactivated_user(mapper, connection, target):
+    if not target.is_active:
+        invalidate_user(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+async def authenticate_token(token: str, db: AsyncSession) -> UserSnapshot:
     """
-    Fetch current user
+    Resolve a raw bearer token to a user.
+    Cached per token: a hit skips both jwt.decode and the users query.
     """
-    token_data = verify_token(token.credentials)
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached[1]
+
+    token_data = verify_token(token)
     # print("TOKEN_DATA", token_data)
-    _user = await db.scalars(select(User).where(User.email == token_data.email))
+    query = select(User).where(User.email == token_data.email)
+    _user = await db.scalars(query)
     # print("DATA", str(_user)
     user = _user.first()
+    if not user and is_replica(db):
+        # Just registered: the replica may not have the row yet
+        async with SessionLocal() as primary:
+            user = (await primary.scalars(query)).first()
     # print("FINAL DATA", str(user))
     if not user:
         raise HTTPException(
@@ -33,14 +72,40 @@ async def get_current_user(
             detail="User does not exist",
             headers={"WWW-authentication": "Bearer"},
         )
-    return user
+
+    snapshot = UserSnapshot.model_validate(user)
+    token_cache.set(token, (token_data, snapshot), expires_at=token_data.exp)
+    return snapshot
+
+
+async def get_current_user(
+    token: str = Depends(auth_scheme), db: AsyncSession = Depends(get_db_read)
+) -> UserSnapshot:
+    """
+    Fetch current user
+    """
+    return await authenticate_token(token.credentials, db)
 
 
 async def get_current_active_user(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[UserSnapshot, Depends(get_current_user)],
 ):
     if not current_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Inactive user"
         )
     return current_user
+
+
+def is_admin(user: UserSnapshot) -> bool:
+    return user.email.lower() in ADMIN_EMAILS
+
+
+async def get_current_admin_user(
+    current_user: Annotated[UserSnapshot, Depends(get_current_active_user)],
+):
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required"
+        )
+    return current_user
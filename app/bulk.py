@@ -0,0 +1,159 @@
+"""
+This module contains the bulk insert engine used by the worker
+"""
+
+import time
+from itertools import chain
+from typing import Callable, Iterable, Optional, Sequence
+
+from decouple import config
+from sqlalchemy import Table, insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from .metrics import INSERT_BATCH_SECONDS
+from .utils import batched
+
+
+INSERT_BATCH_SIZE = config("INSERT_BATCH_SIZE", default=5000, cast=int)
+# SQLite builds older than 3.32 cap bound parameters at 999 per statement
+SQLITE_MAX_VARIABLES = config("SQLITE_MAX_VARIABLES", default=999, cast=int)
+
+# Connection-level tuning applied before a SQLite import, on top of the
+# WAL / synchronous=NORMAL / cache_size settings from app.database (the
+# connection goes back to the pool, so nothing here may override those)
+SQLITE_IMPORT_PRAGMAS = ("PRAGMA temp_store=MEMORY",)
+
+
+class BulkInserter:
+    """
+    Stream row tuples into a table, committing per batch.
+
+    -> Constant memory: only one batch of tuples is resident
+    -> SQLite: cached multi-row VALUES statements sized under the
+       bound-parameter limit, executed on the raw DBAPI cursor
+    -> Other dialects: Core executemany (PyMySQL rewrites it into a
+       multi-row INSERT)
+    -> ignore_duplicates: rows hitting a unique key are skipped
+       (INSERT OR IGNORE / INSERT IGNORE), so batches can be replayed
+    -> With a validator, a batch the database refuses is retried row by
+       row and only the offending rows are rejected
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        table: Table,
+        columns: Sequence[str],
+        batch_size: int = INSERT_BATCH_SIZE,
+        ignore_duplicates: bool = False,
+    ):
+        self.session = session
+        self.table = table
+        self.columns = tuple(columns)
+        self.batch_size = batch_size
+        self.ignore_duplicates = ignore_duplicates
+        self.dialect = session.get_bind().dialect
+        self._statements = {}
+        # Seconds run() spent waiting on `rows` (parsing, for the worker)
+        self.read_seconds = 0.0
+
+    def prepare(self):
+        if self.dialect.name == "sqlite":
+            connection = self.session.connection()
+            for pragma in SQLITE_IMPORT_PRAGMAS:
+                connection.exec_driver_sql(pragma)
+
+    def _multi_values_sql(self, row_count: int) -> str:
+        sql = self._statements.get(row_count)
+        if sql is None:
+            preparer = self.dialect.identifier_preparer
+            names = ", ".join(preparer.quote(name) for name in self.columns)
+            group = "(" + ", ".join("?" * len(self.columns)) + ")"
+            verb = "INSERT OR IGNORE" if self.ignore_duplicates else "INSERT"
+            sql = (
+                f"{verb} INTO {preparer.format_table(self.table)} ({names}) "
+                f"VALUES {', '.join([group] * row_count)}"
+            )
+            self._statements[row_count] = sql
+        return sql
+
+    def insert_batch(self, rows: Sequence[tuple]):
+        if not rows:
+            return
+        connection = self.session.connection()
+        if self.dialect.name == "sqlite":
+            per_statement = max(SQLITE_MAX_VARIABLES // len(self.columns), 1)
+            for chunk in batched(rows, per_statement):
+                connection.exec_driver_sql(
+                    self._multi_values_sql(len(chunk)),
+                    tuple(chain.from_iterable(chunk)),
+                )
+        else:
+            statement = insert(self.table)
+            if self.ignore_duplicates:
+                statement = statement.prefix_with("IGNORE", dialect="mysql")
+            connection.execute(
+                statement, [dict(zip(self.columns, row)) for row in rows]
+            )
+
+    def insert_row_by_row(self, rows: Sequence[tuple], validator):
+        """
+        Isolate the rows of a failed batch; each good row commits alone,
+        together with the rejects pending before it. A resumed job skips
+        committed row numbers, so their rejects must not commit later.
+        """
+        for row in rows:
+            try:
+                self.insert_batch([row])
+                validator.flush()
+                self.session.commit()
+            except (DataError, IntegrityError) as e:
+                self.session.rollback()
+                validator.reject(row, e)
+
+    def run(
+        self,
+        rows: Iterable,
+        validator=None,
+        on_batch: Optional[Callable[[int], None]] = None,
+        on_commit: Optional[Callable[[], None]] = None,
+    ) -> int:
+        """
+        Insert all rows (tuples ordered like `columns`) and return how many
+        were consumed. With a validator (see app.validation.RowValidator),
+        rows are (row_number, values) pairs: validator.split() turns each
+        batch into insert tuples, rejects are flushed with the batch.
+        on_batch(total_so_far) runs before each commit, so anything it
+        changes in the session is committed with the batch; on_commit()
+        runs after it.
+        """
+        self.prepare()
+        total = 0
+        batches = batched(rows, self.batch_size)
+        while True:
+            started = time.perf_counter()
+            batch = next(batches, None)
+            self.read_seconds += time.perf_counter() - started
+            if batch is None:
+                break
+            total += len(batch)
+            if validator is not None:
+                batch = validator.split(batch)
+            try:
+                started = time.perf_counter()
+                self.insert_batch(batch)
+                INSERT_BATCH_SECONDS.observe(time.perf_counter() - started)
+            except (DataError, IntegrityError):
+                if validator is None:
+                    raise
+                self.session.rollback()
+                self.insert_row_by_row(batch, validator)
+            if validator is not None:
+                validator.flush()
+            if on_batch:
+                on_batch(total)
+            self.session.commit()
+            if on_commit:
+                on_commit()
+        return total
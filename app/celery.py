@@ -1,10 +1,39 @@
+import time
+from datetime import datetime
+
 from celery import Celery
+from celery.signals import (
+    before_task_publish,
+    task_prerun,
+    task_retry,
+    task_failure,
+    worker_process_shutdown,
+)
 from decouple import config
 
+from app.metrics import (
+    QUEUE_WAIT_SECONDS,
+    TASK_RETRIES,
+    TASK_FAILURES,
+    mark_process_dead,
+)
 
-# Optional Redis – if not provided, Celery falls back to in-memory backend
+
+# Optional Redis – if not provided, jobs run on the in-process worker pool
 BROKER_URL = config("CELERY_BROKER_URL", default="memory://")
 RESULT_BACKEND = config("CELERY_RESULT_BACKEND", default="cache+memory://")
+IMPORT_QUEUE = config("CELERY_IMPORT_QUEUE", default="imports")
+# How often Celery beat runs the retention task (see app.retention)
+RETENTION_INTERVAL_SECONDS = config(
+    "RETENTION_INTERVAL_SECONDS", default=3600, cast=float
+)
+# How often Celery beat maintains MySQL csv_data partitions (app.partitioning)
+PARTITION_MAINTENANCE_INTERVAL_SECONDS = config(
+    "PARTITION_MAINTENANCE_INTERVAL_SECONDS", default=600, cast=float
+)
+
+# No real broker: app.dispatch runs tasks on a local thread pool instead
+USE_LOCAL_QUEUE = BROKER_URL == "memory://" and RESULT_BACKEND == "cache+memory://"
 
 celery = Celery(
     "csv_worker",
@@ -15,10 +44,25 @@ celery = Celery(
 celery.conf.update(
     task_track_started=True,
     result_expires=3600,
-    # Make Celery optional if running without broker/backend
-    task_always_eager=(
-        BROKER_URL == "memory://" and RESULT_BACKEND == "cache+memory://"
-    ),
+    task_routes={
+        "app.tasks.process_csv_task": {"queue": IMPORT_QUEUE},
+        "app.tasks.purge_expired_jobs_task": {"queue": IMPORT_QUEUE},
+        "app.tasks.maintain_partitions_task": {"queue": IMPORT_QUEUE},
+    },
+    task_queue_max_priority=10,
+    task_default_priority=5,
+    # Redis emulates priorities with one list per step
+    broker_transport_options={"priority_steps": list(range(10))},
+    beat_schedule={
+        "purge-expired-jobs": {
+            "task": "app.tasks.purge_expired_jobs_task",
+            "schedule": RETENTION_INTERVAL_SECONDS,
+        },
+        "maintain-partitions": {
+            "task": "app.tasks.maintain_partitions_task",
+            "schedule": PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+        },
+    },
 )
 # celery.conf.worker_pool = "eventlet"
 # celery.conf.worker_concurrency = 10
@@ -27,3 +71,49 @@ celery.autodiscover_tasks(["app"])
 
 # celery.conf.broker_url = config("CELERY_BROKER_URL")
 # celery.conf.result_backend = config("CELERY_RESULT_BACKEND")
+
+
+# Metrics hooks (see app.metrics). Publishing stamps each message, so a
+# worker can tell how long it sat in the queue; the local worker pool
+# passes the same header to Task.apply().
+@before_task_publish.connect
+def _stamp_enqueued_at(headers=None, **kwargs):
+    if headers is not None:
+        headers["enqueued_at"] = time.time()
+
+
+def _timestamp(value) -> float:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+@task_prerun.connect
+def _observe_queue_wait(task=None, **kwargs):
+    request = task.request
+    if request.is_eager and request.retries:
+        # Local pool retries run inline; they were never queued again
+        return
+    enqueued_at = getattr(request, "enqueued_at", None) or (
+        request.headers or {}
+    ).get("enqueued_at")
+    if enqueued_at is None:
+        return
+    # A retry is published with a countdown; waiting for it is not queueing
+    ready_at = max(enqueued_at, _timestamp(request.eta)) if request.eta else enqueued_at
+    QUEUE_WAIT_SECONDS.labels(task.name).observe(max(time.time() - ready_at, 0.0))
+
+
+@task_retry.connect
+def _count_retry(sender=None, **kwargs):
+    TASK_RETRIES.labels(sender.name).inc()
+
+
+@task_failure.connect
+def _count_failure(sender=None, **kwargs):
+    TASK_FAILURES.labels(sender.name).inc()
+
+
+@worker_process_shutdown.connect
+def _mark_process_dead(pid=None, **kwargs):
+    mark_process_dead(pid)
@@ -0,0 +1,195 @@
+"""
+This module handles compressed uploads: .csv.gz, .csv.bz2, .csv.zst and
+single-member .zip files.
+
+Uploads stay compressed on disk. The API inflates them incrementally
+while they stream in (to count rows and reject corrupt data early), and
+the worker decompresses while it parses. Progress is measured on the
+compressed bytes read.
+"""
+
+import bz2
+import gzip
+import io
+import zipfile
+import zlib
+from typing import Callable, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional: only .csv.zst uploads need it
+    zstandard = None
+
+
+# Accepted upload file name suffix -> compression (None = plain CSV)
+UPLOAD_SUFFIXES = {
+    ".csv": None,
+    ".csv.gz": "gzip",
+    ".csv.bz2": "bz2",
+    ".csv.zst": "zstd",
+    ".zip": "zip",
+}
+
+# Raised by the decompressors on corrupt input
+DECOMPRESS_ERRORS = (zlib.error, OSError, EOFError, ValueError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+READ_BUFFER_SIZE = 1024 * 1024
+# Largest piece of decompressed output held at once while scanning uploads
+OUTPUT_CHUNK_SIZE = 1024 * 1024
+
+
+def upload_suffix(filename: str) -> Optional[str]:
+    """The accepted suffix `filename` ends with, or None."""
+    lowered = filename.lower()
+    for suffix in UPLOAD_SUFFIXES:
+        if lowered.endswith(suffix):
+            return suffix
+    return None
+
+
+def compression_of(file_path: str) -> Optional[str]:
+    """Compression of a stored upload, from its suffix."""
+    return UPLOAD_SUFFIXES.get(upload_suffix(file_path))
+
+
+def is_supported(compression: Optional[str]) -> bool:
+    return compression != "zstd" or zstandard is not None
+
+
+class StreamDecompressor:
+    """
+    Incremental decompressor over concatenated streams (gzip members,
+    bz2 streams), fed the upload chunk by chunk.
+
+    Output goes to sink() in pieces of at most max_length bytes, so a
+    small but highly compressed chunk is never inflated in one piece;
+    sink raises to stop early.
+    """
+
+    def __init__(self, factory, max_length: int = OUTPUT_CHUNK_SIZE):
+        self.factory = factory
+        self.max_length = max_length
+        self.current = factory()
+        self.started = False
+
+    def decompress(self, data: bytes, sink: Callable[[bytes], None]):
+        while data:
+            self.started = True
+            data = self._inflate(data, sink)
+            if not self.current.eof:
+                break
+            self.current = self.factory()
+            self.started = False
+
+    def _inflate(self, data: bytes, sink) -> bytes:
+        """Feed data to the current stream; returns input past its end."""
+        stream = self.current
+        while True:
+            output = stream.decompress(data, self.max_length)
+            if output:
+                sink(output)
+            if stream.eof:
+                return stream.unused_data
+            if isinstance(stream, bz2.BZ2Decompressor):
+                data = b""
+                if stream.needs_input:
+                    return b""
+            else:
+                # zlib: input past the limit, or output still buffered
+                data = stream.unconsumed_tail
+                if not data and len(output) < self.max_length:
+                    return b""
+
+    @property
+    def finished(self) -> bool:
+        """False when the input stopped in the middle of a stream."""
+        return not self.started
+
+
+class ZstdStreamDecompressor:
+    """
+    StreamDecompressor for zstd frames. zstandard's decompressobj cannot
+    bound its output, so input goes through a stream_writer that hands
+    sink() pieces of at most max_length bytes.
+
+    Frame ends are not reported: a truncated file is only rejected when
+    it is imported.
+    """
+
+    finished = True
+
+    def __init__(self, max_length: int = OUTPUT_CHUNK_SIZE):
+        self.sink = None
+        self.writer = zstandard.ZstdDecompressor().stream_writer(
+            self, write_size=max_length, closefd=False
+        )
+
+    def write(self, data: bytes) -> int:
+        self.sink(data)
+        return len(data)
+
+    def decompress(self, data: bytes, sink: Callable[[bytes], None]):
+        self.sink = sink
+        self.writer.write(data)
+
+
+def stream_decompressor(compression: Optional[str]):
+    """
+    Decompressor for counting rows during upload. None for plain CSV and
+    for zip, whose member can only be located once the file is complete.
+    """
+    if compression == "gzip":
+        return StreamDecompressor(lambda: zlib.decompressobj(wbits=31))
+    if compression == "bz2":
+        return StreamDecompressor(bz2.BZ2Decompressor)
+    if compression == "zstd":
+        return ZstdStreamDecompressor()
+    return None
+
+
+def zip_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+    """The one file in the archive; ValueError otherwise."""
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    if len(members) != 1:
+        raise ValueError(
+            f"Zip uploads must contain exactly one file, found {len(members)}"
+        )
+    return members[0]
+
+
+def check_zip(file_path: str) -> int:
+    """
+    Validate a stored zip upload and return its member's uncompressed
+    size. ValueError when it is not a single-member zip.
+    """
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            return zip_member(archive).file_size
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid zip file: {e}")
+
+
+def open_decompressed(fp, compression: Optional[str]):
+    """
+    Binary file object over the decompressed bytes of fp (which stays
+    owned by the caller). Plain CSV returns fp itself.
+    """
+    if compression is None:
+        return fp
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=fp, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(fp, mode="rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading .csv.zst files requires the zstandard package")
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            fp, read_across_frames=True, closefd=False
+        )
+        return io.BufferedReader(reader, READ_BUFFER_SIZE)
+    if compression == "zip":
+        archive = zipfile.ZipFile(fp)
+        return io.BufferedReader(archive.open(zip_member(archive)), READ_BUFFER_SIZE)
+    raise ValueError(f"Unknown compression {compression!r}")
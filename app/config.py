@@ -0,0 +1,71 @@
+"""
+This module contains application settings shared by the API and the worker
+"""
+
+import os
+from pathlib import Path
+from decouple import config
+
+
+BASE_DIR = Path(__file__).resolve().parent
+UPLOAD_DIR = BASE_DIR / "uploads"
+# Resumable uploads in progress (POST /uploads), and how long an
+# unfinished one is kept
+UPLOAD_SESSION_DIR = UPLOAD_DIR / "sessions"
+UPLOAD_SESSION_TTL_HOURS = config("UPLOAD_SESSION_TTL_HOURS", default=24, cast=float)
+# Longest a PATCH or finalize may hold an upload before others may take it
+UPLOAD_SESSION_LOCK_SECONDS = config(
+    "UPLOAD_SESSION_LOCK_SECONDS", default=300, cast=int
+)
+# Per-job profiles (see app.profiling); shared by the API and the worker
+PROFILE_DIR = BASE_DIR / "profiles"
+
+# Upload streaming
+MAX_UPLOAD_BYTES = config("MAX_UPLOAD_BYTES", default=2 * 1024**3, cast=int)
+UPLOAD_CHUNK_SIZE = config("UPLOAD_CHUNK_SIZE", default=1024 * 1024, cast=int)
+# Cap on the CSV inside a compressed upload (.gz/.bz2/.zst/.zip)
+MAX_DECOMPRESSED_BYTES = config(
+    "MAX_DECOMPRESSED_BYTES", default=16 * MAX_UPLOAD_BYTES, cast=int
+)
+# POST /upload/batch: files per batch (zip members included), and how
+# many of them are written to disk at the same time
+MAX_BATCH_FILES = config("MAX_BATCH_FILES", default=500, cast=int)
+BATCH_SAVE_CONCURRENCY = config("BATCH_SAVE_CONCURRENCY", default=4, cast=int)
+# Whole POST /upload/batch body (each file is still capped at MAX_UPLOAD_BYTES)
+MAX_BATCH_UPLOAD_BYTES = config(
+    "MAX_BATCH_UPLOAD_BYTES", default=8 * MAX_UPLOAD_BYTES, cast=int
+)
+# Return the existing job when a user re-uploads an identical file
+DEDUPLICATE_UPLOADS = config("DEDUPLICATE_UPLOADS", default=True, cast=bool)
+
+# Row pagination
+ROWS_PAGE_MAX = config("ROWS_PAGE_MAX", default=1000, cast=int)
+
+# CSV parser backend: auto | stdlib | pyarrow
+CSV_PARSER = config("CSV_PARSER", default="auto")
+
+# Reject rows whose field count differs from the header's. Off by default:
+# short rows are padded with NULLs and extra fields are ignored, as before
+VALIDATE_FIELD_COUNT = config("VALIDATE_FIELD_COUNT", default=False, cast=bool)
+
+# Parallel parsing of large files (worker side)
+PARALLEL_PARSE_MIN_BYTES = config(
+    "PARALLEL_PARSE_MIN_BYTES", default=64 * 1024 * 1024, cast=int
+)
+PARSE_CHUNK_BYTES = config("PARSE_CHUNK_BYTES", default=16 * 1024 * 1024, cast=int)
+PARSE_WORKERS = config("PARSE_WORKERS", default=os.cpu_count() or 1, cast=int)
+# Bytes of ranges parsed ahead of the inserts (parsed rows take several
+# times their size in memory); at least one range is always in flight
+PARSE_IN_FLIGHT_BYTES = config(
+    "PARSE_IN_FLIGHT_BYTES", default=128 * 1024 * 1024, cast=int
+)
+
+# CSVData storage: shared | partitioned
+# -> partitioned on MySQL: csv_data RANGE-partitioned on job_id
+# -> partitioned on SQLite: one csv_data_<job_id> table per job
+CSV_DATA_STORAGE = config("CSV_DATA_STORAGE", default="shared")
+# MySQL: job ids per partition (1 = one partition per job; MySQL allows
+# at most 8192 partitions per table)
+CSV_DATA_PARTITION_JOBS = config("CSV_DATA_PARTITION_JOBS", default=1000, cast=int)
+# MySQL: ranges kept created ahead of the newest job (see app.partitioning)
+CSV_DATA_PARTITIONS_AHEAD = config("CSV_DATA_PARTITIONS_AHEAD", default=8, cast=int)
@@ -1,9 +1,15 @@
+import time
 from pathlib import Path
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from fastapi.requests import HTTPConnection
 from decouple import config
 
+from .cache import TTLCache
+from .metrics import DB_POOL_CHECKOUT_SECONDS
+
 
 # for-db(except sqlite)
 # DB_HOST = config("DB_HOST")
@@ -16,11 +22,100 @@ from decouple import config
 BASE_DIR = Path(__file__).resolve().parent
 SQLITE_DB_PATH = BASE_DIR / "../app.db"
 
+# Pool settings (ignored for SQLite)
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=10, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=20, cast=int)
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30, cast=int)
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=True, cast=bool)
+
+# SQLite connection tuning
+SQLITE_BUSY_TIMEOUT_MS = config("SQLITE_BUSY_TIMEOUT_MS", default=10000, cast=int)
+SQLITE_MMAP_SIZE = config("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024, cast=int)
+SQLITE_CACHE_SIZE_KB = config("SQLITE_CACHE_SIZE_KB", default=32768, cast=int)
+
+
+def engine_options(url: str) -> dict:
+    """
+    create_engine kwargs for a URL.
+    -> MySQL etc.: pool size/overflow/recycle/pre-ping from env
+    -> SQLite: default pool, shared across threads
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {
+            # required for SQLite multi-thread usage
+            "connect_args": {
+                "check_same_thread": False,
+                "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            },
+        }
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def configure_sqlite(engine: Engine):
+    """
+    Apply per-connection PRAGMAs so the API and the worker can share the
+    file: WAL lets readers run during a bulk insert, busy_timeout waits
+    out short write locks instead of failing with "database is locked".
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.close()
+
+
+def _time_checkouts(pool, name: str):
+    do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(name).observe(
+                time.perf_counter() - started
+            )
+
+    pool._do_get = timed_do_get
+
+
+def instrument_pool(engine: Engine, name: str):
+    """
+    Record how long checkouts wait on the engine's pool (including
+    opening new connections) as db_pool_checkout_seconds{engine=name}.
+    Re-applied when dispose() replaces the pool.
+    """
+    _time_checkouts(engine.pool, name)
+    event.listen(
+        engine, "engine_disposed", lambda disposed: _time_checkouts(disposed.pool, name)
+    )
+
+
 # 1. ASYNC CONNECTION (For FastAPI)
 # DATABASE_URL_ASYNC = f"mysql+aiomysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-DATABASE_URL_ASYNC = f"sqlite+aiosqlite:///{SQLITE_DB_PATH}"
+DATABASE_URL_ASYNC = config(
+    "DATABASE_URL_ASYNC", default=f"sqlite+aiosqlite:///{SQLITE_DB_PATH}"
+)
 
-engine = create_async_engine(DATABASE_URL_ASYNC, echo=False, future=True)
+engine = create_async_engine(
+    DATABASE_URL_ASYNC, echo=False, future=True, **engine_options(DATABASE_URL_ASYNC)
+)
+configure_sqlite(engine.sync_engine)
+instrument_pool(engine.sync_engine, "api")
 SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -29,18 +124,70 @@ async def get_db():
         yield session
 
 
+# 1b. OPTIONAL READ REPLICA (status polling, /auth/me)
+# Unset: every read goes to the primary.
+DATABASE_URL_READ = config("DATABASE_URL_READ", default="")
+# How long after a write reads of the same job stay on the primary
+REPLICA_LAG_SECONDS = config("REPLICA_LAG_SECONDS", default=5.0, cast=float)
+
+read_engine = None
+ReadSessionLocal = SessionLocal
+if DATABASE_URL_READ:
+    read_engine = create_async_engine(
+        DATABASE_URL_READ, echo=False, future=True, **engine_options(DATABASE_URL_READ)
+    )
+    configure_sqlite(read_engine.sync_engine)
+    instrument_pool(read_engine.sync_engine, "api_read")
+    ReadSessionLocal = sessionmaker(
+        bind=read_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        info={"replica": True},
+    )
+
+# "job:<id>" -> True while the replica may not have seen our write yet
+recent_writes = TTLCache(maxsize=10000, ttl=REPLICA_LAG_SECONDS)
+
+
+def mark_recent_write(job_id: int):
+    """Pin reads of this job to the primary for REPLICA_LAG_SECONDS."""
+    if read_engine is not None:
+        recent_writes.set(f"job:{job_id}", True)
+
+
+def is_replica(session: AsyncSession) -> bool:
+    return bool(session.info.get("replica"))
+
+
+async def get_db_read(connection: HTTPConnection):
+    """
+    Session for read-only endpoints.
+    -> replica when DATABASE_URL_READ is set
+    -> primary when the path's job_id was written within REPLICA_LAG_SECONDS
+    Callers that miss on the replica should retry on the primary
+    (see is_replica), since new rows may not have replicated yet.
+    """
+    job_id = connection.path_params.get("job_id")
+    if job_id is not None and recent_writes.get(f"job:{job_id}"):
+        factory = SessionLocal
+    else:
+        factory = ReadSessionLocal
+    async with factory() as session:
+        yield session
+
+
 # 2. SYNCHRONOUS CONNECTION (For Celery) <--- ADD THIS
 # DATABASE_URL_SYNC = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 # sync_engine = create_engine(DATABASE_URL_SYNC, echo=False, pool_pre_ping=True)
 # SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
 
 
-DATABASE_URL_SYNC = f"sqlite:///{SQLITE_DB_PATH}"
+DATABASE_URL_SYNC = config("DATABASE_URL_SYNC", default=f"sqlite:///{SQLITE_DB_PATH}")
 sync_engine = create_engine(
-    DATABASE_URL_SYNC,
-    echo=False,
-    connect_args={"check_same_thread": False},  # required for SQLite multi-thread usage
+    DATABASE_URL_SYNC, echo=False, **engine_options(DATABASE_URL_SYNC)
 )
+configure_sqlite(sync_engine)
+instrument_pool(sync_engine, "worker")
 SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
 
 Base = declarative_base()
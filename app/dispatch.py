@@ -0,0 +1,270 @@
+"""
+This module dispatches import jobs to the Celery broker, or to an
+in-process worker pool when no broker is configured.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from celery import group
+from decouple import config
+from fastapi import HTTPException, status
+from kombu.exceptions import OperationalError
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.celery import BROKER_URL, IMPORT_QUEUE, USE_LOCAL_QUEUE
+from .models import UploadCSV, UNFINISHED_STATUSES
+from .tasks import process_csv_task
+
+
+logger = logging.getLogger(__name__)
+
+MAX_IN_FLIGHT_JOBS = config("MAX_IN_FLIGHT_JOBS", default=100, cast=int)
+LOCAL_WORKERS = config("LOCAL_WORKERS", default=2, cast=int)
+RETRY_AFTER_SECONDS = config("QUEUE_RETRY_AFTER_SECONDS", default=10, cast=int)
+# Unfinished jobs untouched for this long (a killed worker, a lost
+# message) no longer count against MAX_IN_FLIGHT_JOBS; running imports
+# bump updated_at with every progress update
+STALE_JOB_SECONDS = config("STALE_JOB_SECONDS", default=3600, cast=int)
+
+
+class LocalWorkerPool:
+    """
+    Priority queue + worker threads standing in for Redis and a Celery
+    worker. Tasks run through Task.apply(), so retries and task state
+    behave like an eager Celery run.
+    """
+
+    def __init__(self, workers: int, max_in_flight: int):
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._threads = []
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def is_full(self) -> bool:
+        return self.in_flight >= self.max_in_flight
+
+    def has_room(self, count: int) -> bool:
+        return self.in_flight + count <= self.max_in_flight
+
+    def submit(self, task, task_id: str, kwargs: dict, priority: int) -> bool:
+        """
+        Queue a task. Returns False when the backlog is full.
+        Submitting a task_id that is already queued or running is a no-op.
+        """
+        with self._lock:
+            if task_id in self._in_flight:
+                return True
+            if self.is_full():
+                return False
+            self._in_flight.add(task_id)
+            self._start()
+        # PriorityQueue pops the smallest item first
+        self._queue.put((-priority, next(self._seq), task, task_id, kwargs, time.time()))
+        return True
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._queue.put((float("inf"), next(self._seq), None, None, None, None))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _start(self):
+        # Threads are started lazily so importing this module (e.g. in a
+        # Celery worker) never spawns them.
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._run, name=f"local-worker-{len(self._threads)}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            _, _, task, task_id, kwargs, enqueued_at = self._queue.get()
+            if task is None:
+                break
+            try:
+                result = task.apply(
+                    kwargs=kwargs,
+                    task_id=task_id,
+                    headers={"enqueued_at": enqueued_at},
+                )
+                if result.failed():
+                    logger.error(f"[LOCAL WORKER] {task_id} failed: {result.result}")
+            except Exception as e:
+                logger.error(f"[LOCAL WORKER] {task_id} crashed: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight.discard(task_id)
+
+
+local_pool = LocalWorkerPool(workers=LOCAL_WORKERS, max_in_flight=MAX_IN_FLIGHT_JOBS)
+
+
+def _backlog_full() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Import backlog is full. Retry later.",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+async def ensure_capacity(db: AsyncSession, jobs: int = 1):
+    """
+    Reject early (429) when the import backlog has no room for `jobs`
+    more jobs, before the upload body is written to disk.
+    Stale unfinished jobs (see STALE_JOB_SECONDS) are not counted.
+    """
+    if USE_LOCAL_QUEUE:
+        if not local_pool.has_room(jobs):
+            raise _backlog_full()
+        return
+
+    stale_before = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+        seconds=STALE_JOB_SECONDS
+    )
+    in_flight = await db.scalar(
+        select(func.count(UploadCSV.id)).where(
+            UploadCSV.status.in_(UNFINISHED_STATUSES),
+            UploadCSV.updated_at >= stale_before,
+        )
+    )
+    if in_flight + jobs > MAX_IN_FLIGHT_JOBS:
+        raise _backlog_full()
+
+
+def priority_for(total_rows: Optional[int], file_size: Optional[int] = None) -> int:
+    """
+    Small files jump ahead of huge ones so they are not starved.
+    Returns 0-9 where 9 is the most urgent.
+
+    Without a row count (archives are not counted on upload) the stored
+    size stands in for it; with neither the job goes last.
+    """
+    if total_rows is None:
+        if file_size is None:
+            return 1
+        if file_size < 1024 * 1024:
+            return 9
+        if file_size < 100 * 1024 * 1024:
+            return 5
+        return 1
+    if total_rows < 10_000:
+        return 9
+    if total_rows < 1_000_000:
+        return 5
+    return 1
+
+
+def import_task_id(job_id: int) -> str:
+    """Deterministic task id, used as the idempotency key for a job."""
+    return f"csv-import-{job_id}"
+
+
+def _import_options(
+    job_id: int,
+    file_path: str,
+    total_rows: Optional[int] = None,
+    file_size: Optional[int] = None,
+    profile: Optional[str] = None,
+) -> Tuple[str, dict, int]:
+    """(task id, task kwargs, priority) of a job's import task."""
+    kwargs = {"job_id": job_id, "file_path": file_path}
+    if profile:
+        kwargs["profile"] = profile
+    priority = priority_for(total_rows, file_size)
+    if not USE_LOCAL_QUEUE and BROKER_URL.startswith(("redis", "rediss")):
+        # Redis treats 0 as the highest priority
+        priority = 9 - priority
+    return import_task_id(job_id), kwargs, priority
+
+
+def _broker_unavailable(job_ids: List[int], error: Exception) -> HTTPException:
+    logger.error(f"[DISPATCH] Broker unavailable for jobs {job_ids}: {error}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Task queue is unavailable. Retry later.",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+def enqueue_import(
+    job_id: int,
+    file_path: str,
+    total_rows: Optional[int] = None,
+    file_size: Optional[int] = None,
+    profile: Optional[str] = None,
+) -> str:
+    """
+    Enqueue process_csv_task for a job and return the task id.
+    profile: record a profile of the import (see app.profiling).
+
+    -> No broker: local worker pool, 429 when full
+    -> Broker: apply_async with routing and priority, 503 if unreachable
+    """
+    task_id, kwargs, priority = _import_options(
+        job_id, file_path, total_rows, file_size, profile
+    )
+
+    if USE_LOCAL_QUEUE:
+        if not local_pool.submit(process_csv_task, task_id, kwargs, priority):
+            raise _backlog_full()
+        return task_id
+
+    try:
+        process_csv_task.apply_async(
+            kwargs=kwargs,
+            task_id=task_id,
+            queue=IMPORT_QUEUE,
+            priority=priority,
+        )
+    except OperationalError as e:
+        raise _broker_unavailable([job_id], e)
+    return task_id
+
+
+def enqueue_imports(
+    jobs: List[Tuple[int, str, Optional[int], Optional[int]]]
+) -> List[int]:
+    """
+    Enqueue the imports of several (job_id, file_path, total_rows,
+    file_size) at once. Returns the ids of jobs that were not queued.
+
+    -> No broker: submitted to the local pool one by one, until it is full
+    -> Broker: one Celery group, published over a single connection;
+       503 (nothing queued) if unreachable
+    """
+    options = [_import_options(*job) for job in jobs]
+
+    if USE_LOCAL_QUEUE:
+        for index, (task_id, kwargs, priority) in enumerate(options):
+            if not local_pool.submit(process_csv_task, task_id, kwargs, priority):
+                return [job[0] for job in jobs[index:]]
+        return []
+
+    tasks = group(
+        process_csv_task.signature(
+            kwargs=kwargs, task_id=task_id, queue=IMPORT_QUEUE, priority=priority
+        )
+        for task_id, kwargs, priority in options
+    )
+    try:
+        tasks.apply_async()
+    except OperationalError as e:
+        raise _broker_unavailable([job[0] for job in jobs], e)
+    return []
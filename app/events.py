@@ -0,0 +1,189 @@
+"""
+This module fans out job status/progress events from the worker to
+SSE and WebSocket subscribers.
+
+-> In-memory broker: worker and API share a process (local worker pool)
+-> Redis broker: EVENTS_REDIS_URL (defaults to a redis:// Celery broker)
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from decouple import config
+
+from app.celery import BROKER_URL
+from .database import SessionLocal
+from .models import UploadCSV, JobStatus
+from .schemas import UploadCSVOut
+
+
+logger = logging.getLogger(__name__)
+
+EVENTS_REDIS_URL = config(
+    "EVENTS_REDIS_URL", default=BROKER_URL if BROKER_URL.startswith("redis") else ""
+)
+# Idle subscribers re-read the job this often, in case no broker event
+# can reach them (e.g. remote worker without Redis); also the heartbeat.
+EVENTS_POLL_SECONDS = config("EVENTS_POLL_SECONDS", default=15.0, cast=float)
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# RETRYING is not final: the next attempt keeps publishing
+TERMINAL_STATUSES = {
+    JobStatus.SUCCESS.value,
+    JobStatus.PARTIAL.value,
+    JobStatus.FAILED.value,
+}
+
+
+def job_event(job: UploadCSV) -> dict:
+    """Event payload: same shape as GET /jobs/{job_id}."""
+    return UploadCSVOut.model_validate(job).model_dump(mode="json")
+
+
+class InMemoryBroker:
+    """
+    Process-local pub/sub. publish() is thread-safe so worker threads can
+    call it; subscribers are asyncio queues bound to their event loop.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, job_id: int, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                pass  # subscriber's loop already closed
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: dict):
+        # Slow consumers drop the oldest event; the latest state wins
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    @asynccontextmanager
+    async def subscribe(self, job_id: int):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[job_id].add(entry)
+        try:
+            yield _QueueSubscription(queue)
+        finally:
+            with self._lock:
+                self._subscribers[job_id].discard(entry)
+                if not self._subscribers[job_id]:
+                    del self._subscribers[job_id]
+
+
+class _QueueSubscription:
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RedisBroker:
+    """Redis pub/sub, one channel per job. Requires the `redis` package."""
+
+    def __init__(self, url: str):
+        import redis
+        import redis.asyncio
+
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+        self._async_module = redis.asyncio
+
+    @staticmethod
+    def channel(job_id: int) -> str:
+        return f"job-events:{job_id}"
+
+    def publish(self, job_id: int, event: dict):
+        self._client.publish(self.channel(job_id), json.dumps(event))
+
+    @asynccontextmanager
+    async def subscribe(self, job_id: int):
+        client = self._async_module.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.channel(job_id))
+        try:
+            yield _RedisSubscription(pubsub)
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+            await client.aclose()
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        message = await self.pubsub.get_message(
+            ignore_subscribe_messages=True, timeout=timeout
+        )
+        if message is None:
+            return None
+        return json.loads(message["data"])
+
+
+broker = RedisBroker(EVENTS_REDIS_URL) if EVENTS_REDIS_URL else InMemoryBroker()
+
+
+def publish_job_event(job: UploadCSV):
+    """Publish the job's current state. Never fails the caller."""
+    try:
+        broker.publish(job.id, job_event(job))
+    except Exception as e:
+        logger.warning(f"[EVENTS] publish failed for job {job.id}: {e}")
+
+
+async def load_job_event(job_id: int) -> Optional[dict]:
+    async with SessionLocal() as session:
+        job = await session.get(UploadCSV, job_id)
+        return job_event(job) if job else None
+
+
+async def iter_job_events(job_id: int) -> AsyncIterator[Optional[dict]]:
+    """
+    Yield job states until the job reaches SUCCESS/PARTIAL/FAILED.
+    Yields None when idle for EVENTS_POLL_SECONDS (use as a heartbeat).
+    """
+    async with broker.subscribe(job_id) as subscription:
+        # Subscribe first, then read: no transition can slip in between
+        last = await load_job_event(job_id)
+        if last is None:
+            return
+        yield last
+
+        while last["status"] not in TERMINAL_STATUSES:
+            event = await subscription.get(timeout=EVENTS_POLL_SECONDS)
+            if event is None:
+                event = await load_job_event(job_id)
+                if event is None:
+                    return
+                if event == last:
+                    yield None
+                    continue
+            last = event
+            yield event
+
+
+def format_sse(event: Optional[dict]) -> str:
+    if event is None:
+        return ": ping\n\n"
+    return f"event: job\ndata: {json.dumps(event)}\n\n"
@@ -1,21 +1,111 @@
+import asyncio
 import os
+import shutil
+import time
 import uuid
-from pathlib import Path
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Request
+import zipfile
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal, Optional
+from fastapi import (
+    FastAPI,
+    Header,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, update, or_
+from starlette.requests import ClientDisconnect
 from contextlib import asynccontextmanager
 
-from app.routers import router
-from .database import Base, engine, get_db
-from .models import UploadCSV, JobStatus, User
-from .schemas import UploadResponse, UploadCSVOut
-from .tasks import process_csv_task
-from .auth import get_current_active_user, get_current_user
-
-BASE_DIR = Path(__file__).resolve().parent
-UPLOAD_DIR = BASE_DIR / "uploads"
+from app.routers import router, schema_router
+from .database import (
+    Base,
+    engine,
+    read_engine,
+    get_db,
+    get_db_read,
+    is_replica,
+    mark_recent_write,
+    SessionLocal,
+)
+from .models import (
+    UploadCSV,
+    UploadBatch,
+    UploadSession,
+    CSVReject,
+    ImportSchema,
+    JobStatus,
+    UNFINISHED_STATUSES,
+    PARTITIONED,
+    csv_data_table,
+    ensure_job_storage,
+)
+from .schemas import (
+    UploadResponse,
+    BatchUploadJob,
+    BatchUploadResponse,
+    UploadBatchOut,
+    UploadForm,
+    BatchUploadForm,
+    UploadSessionCreate,
+    UploadSessionOut,
+    UploadCSVOut,
+    CSVRowPage,
+    CSVRejectPage,
+    CSV_ROW_FIELDS,
+    UserSnapshot,
+)
+from .dispatch import ensure_capacity, enqueue_import, enqueue_imports, local_pool
+from .auth import (
+    get_current_active_user,
+    get_current_admin_user,
+    get_current_user,
+    authenticate_token,
+    is_admin,
+)
+from .config import (
+    UPLOAD_DIR,
+    MAX_UPLOAD_BYTES,
+    MAX_DECOMPRESSED_BYTES,
+    UPLOAD_CHUNK_SIZE,
+    ROWS_PAGE_MAX,
+    DEDUPLICATE_UPLOADS,
+    MAX_BATCH_FILES,
+    MAX_BATCH_UPLOAD_BYTES,
+    BATCH_SAVE_CONCURRENCY,
+    UPLOAD_SESSION_DIR,
+    UPLOAD_SESSION_TTL_HOURS,
+    UPLOAD_SESSION_LOCK_SECONDS,
+)
+from .utils import (
+    save_upload_stream,
+    scan_stored_upload,
+    delete_file_safe,
+    AsyncFileReader,
+    StoredUpload,
+)
+from .mapping import decode_extras
+from .compression import UPLOAD_SUFFIXES, upload_suffix, is_supported
+from .export import iter_job_export, EXPORT_MEDIA_TYPES
+from .events import iter_job_events, format_sse
+from .metrics import UPLOAD_BYTES, UPLOAD_SECONDS, render_metrics
+from .profiling import find_profile
+from .multipart import (
+    FORM_OVERHEAD_BYTES,
+    MultipartStream,
+    form_openapi,
+    missing_form_file,
+    parse_form,
+)
  
 
 @asynccontextmanager
@@ -24,18 +114,23 @@ async def lifespan(app: FastAPI):
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         os.makedirs(UPLOAD_DIR, exist_ok=True)
+        os.makedirs(UPLOAD_SESSION_DIR, exist_ok=True)
         # print("\n✅ FastAPI Started | Upload Dir OK.\n")
     except Exception as e:
         # print("error: Upload Dir\n",str(e))
         raise str(e)
     yield
+    local_pool.shutdown()
     await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
     # delete_file_safe(UPLOAD_DIR)
     # print("❌ Database connection closed cleanly")
 
 
 app = FastAPI(title="queue-driven-importer", lifespan=lifespan)
 app.include_router(router)
+app.include_router(schema_router)
 
 
 @app.post(
@@ -43,40 +138,176 @@ app.include_router(router)
     response_model=UploadResponse,
     status_code=202,
     summary="Upload CSV file for async background processing",
+    openapi_extra=form_openapi(UploadForm, "file"),
 )
 async def upload_csv(
     request: Request,
-    file: UploadFile = File(...),
+    response: Response,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
-    if not file.filename.lower().endswith(".csv"):
-        raise HTTPException(400, "Only CSV files are allowed")
+    """
+    Multipart form: `file`, plus optional `schema_id` and `profile`
+    (admins). The body is parsed as it streams (see app.multipart), so
+    an oversized upload or a full backlog is refused before it is read.
+    """
+    started = time.perf_counter()
+    form = MultipartStream(request, MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES)
+    # Fail fast before the body is written to disk
+    await ensure_capacity(db)
+
+    fields, checked, upload = {}, None, None
+    try:
+        while part := await form.next_part():
+            if part.filename is None:
+                fields[part.name] = await form.read_field()
+            elif part.name != "file" or upload is not None:
+                raise HTTPException(400, "Send exactly one file, as the `file` field")
+            else:
+                # Fields sent before the file are checked before it is stored
+                options, schema_version = await check_upload_form(
+                    db, fields, current_user
+                )
+                checked = dict(fields)
+                upload = (part.filename, *await store_form_file(form, part.filename))
+        if upload is None:
+            raise missing_form_file("file")
+        if fields != checked:
+            options, schema_version = await check_upload_form(db, fields, current_user)
+    except BaseException:
+        if upload is not None:
+            delete_file_safe(upload[1])
+        raise
+    filename, file_path, stored = upload
+    UPLOAD_BYTES.observe(stored.size)
+
+    result = await create_import_job(
+        db,
+        response,
+        current_user,
+        filename,
+        file_path,
+        stored,
+        schema_id=options.schema_id,
+        schema_version=schema_version,
+        profile=options.profile,
+    )
+    outcome = "deduplicated" if result.deduplicated else "created"
+    UPLOAD_SECONDS.labels(outcome).observe(time.perf_counter() - started)
+    return result
+
 
-    # Generate unique filename & save locally temporarily
-    unique_name = f"{uuid.uuid4().hex}.csv"
-    file_path = os.path.join(UPLOAD_DIR, unique_name)
+async def check_upload_form(
+    db: AsyncSession, fields: dict, user: UserSnapshot
+) -> tuple:
+    """(UploadForm, schema version) from POST /upload's form fields."""
+    options = parse_form(UploadForm, fields)
+    schema_version = await get_schema_version(db, options.schema_id, user)
+    if options.profile and not is_admin(user):
+        raise HTTPException(403, "Profiling imports requires admin access")
+    return options, schema_version
 
+
+async def store_form_file(form: MultipartStream, filename: str) -> tuple:
+    """
+    Stream the form's current file part to disk; (file_path, StoredUpload).
+    Compressed files are stored as sent, under their original suffix.
+    """
+    suffix = check_upload_suffix(filename)
+    file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}{suffix}")
     try:
-        content = await file.read()
-        with open(file_path, "wb") as fp:
-            fp.write(content)
+        stored = await save_upload_stream(
+            form,
+            file_path,
+            max_size=MAX_UPLOAD_BYTES,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            compression=UPLOAD_SUFFIXES[suffix],
+            max_csv_size=MAX_DECOMPRESSED_BYTES,
+        )
+    except (HTTPException, ClientDisconnect):
+        raise
     except Exception as e:
         raise HTTPException(500, f"Failed to store file: {e}")
+    return file_path, stored
+
+
+def check_upload_suffix(filename: str) -> str:
+    """The file's accepted suffix; 400 for other or unsupported types."""
+    suffix = upload_suffix(filename)
+    if suffix is None:
+        raise HTTPException(
+            400, "Only CSV files are allowed (.csv, .csv.gz, .csv.bz2, .csv.zst, .zip)"
+        )
+    if not is_supported(UPLOAD_SUFFIXES[suffix]):
+        raise HTTPException(400, f"{suffix} uploads are not supported on this server")
+    return suffix
+
+
+async def create_import_job(
+    db: AsyncSession,
+    response: Response,
+    user: UserSnapshot,
+    filename: str,
+    file_path: str,
+    stored: StoredUpload,
+    schema_id: Optional[int] = None,
+    schema_version: Optional[int] = None,
+    profile: Optional[str] = None,
+) -> UploadResponse:
+    """
+    Turn a stored upload into a job and hand it to the worker, or return
+    the user's job for an identical file (200) and drop the new copy.
+    """
+    # Identical file already imported by this user: reuse that job
+    # (unless the import is to be profiled)
+    if DEDUPLICATE_UPLOADS and not profile:
+        duplicate = await find_duplicate_job(
+            db, user.id, stored.sha256, schema_id, schema_version
+        )
+        if duplicate:
+            delete_file_safe(file_path)
+            response.status_code = 200
+            return UploadResponse(
+                job_id=duplicate.id,
+                status=duplicate.status,
+                message="Identical file already imported. Returning the existing job.",
+                deduplicated=True,
+            )
 
     # Create DB job entry
     job = UploadCSV(
-        original_filename=file.filename,
+        original_filename=filename,
         file_path=file_path,
         status=JobStatus.PENDING,
-        user_id=current_user.id,
+        user_id=user.id,
+        file_size=stored.size,
+        total_rows=stored.total_rows,
+        content_hash=stored.sha256,
+        schema_id=schema_id,
+        schema_version=schema_version,
     )
     db.add(job)
     await db.commit()
     await db.refresh(job)
+    mark_recent_write(job.id)
+    if PARTITIONED:
+        await prepare_job_storage(db, [job])
 
-    # Call Celery task asynchronously
-    process_csv_task(job_id=job.id, file_path=file_path)
+    # Hand off to the worker; the request never runs the import itself
+    try:
+        enqueue_import(
+            job.id,
+            file_path,
+            total_rows=job.total_rows,
+            file_size=job.file_size,
+            profile=profile,
+        )
+    except HTTPException as e:
+        job.status = JobStatus.FAILED
+        job.error_message = f"Not enqueued: {e.detail}"
+        await db.commit()
+        delete_file_safe(file_path)
+        raise
 
     return UploadResponse(
         job_id=job.id,
@@ -85,32 +316,922 @@ async def upload_csv(
     )
 
 
-# 2) FETCH JOB STATUS + CSV Results ❌❌❌error
+async def prepare_job_storage(db: AsyncSession, jobs: List[UploadCSV]):
+    """
+    Create the jobs' tables before their rows are first read. On failure
+    the jobs are FAILED and their files dropped (they are never enqueued),
+    and the request gets a 503.
+    """
+    job_ids = [job.id for job in jobs]
+    file_paths = [job.file_path for job in jobs]
+
+    def create_storage(session):
+        for job_id in job_ids:
+            ensure_job_storage(session.connection(), job_id)
+
+    try:
+        await db.run_sync(create_storage)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        await db.execute(
+            update(UploadCSV)
+            .where(UploadCSV.id.in_(job_ids))
+            .values(status=JobStatus.FAILED, error_message=f"Storage setup failed: {e}")
+        )
+        await db.commit()
+        for file_path in file_paths:
+            delete_file_safe(file_path)
+        raise HTTPException(503, "Could not prepare storage for the import. Retry later.")
+
+
+async def get_schema_version(
+    db: AsyncSession, schema_id: Optional[int], user: UserSnapshot
+) -> Optional[int]:
+    """Current version of the user's import schema; 400 if unknown."""
+    if schema_id is None:
+        return None
+    schema = await db.get(ImportSchema, schema_id)
+    if not schema or schema.user_id != user.id:
+        raise HTTPException(400, "Unknown import schema")
+    return schema.version
+
+
+async def receive_batch_file(
+    form: MultipartStream, filename: str, archives: list
+) -> List[tuple]:
+    """
+    Stream one file part of a batch to disk; returns its (filename,
+    suffix, source) entries. A .zip contributes one entry per member,
+    with (archive, member) as source, and is added to `archives`; other
+    files are stored right away, with (file_path, StoredUpload) as
+    source. 400/413 on anything unsupported.
+    """
+    suffix = upload_suffix(filename)
+    if suffix is None or not is_supported(UPLOAD_SUFFIXES[suffix]):
+        raise HTTPException(400, f"{filename}: unsupported file type")
+    file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}{suffix}")
+    try:
+        stored = await save_upload_stream(
+            form,
+            file_path,
+            max_size=MAX_UPLOAD_BYTES,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            # The archive itself is only a container; members are checked
+            compression=None if suffix == ".zip" else UPLOAD_SUFFIXES[suffix],
+            max_csv_size=MAX_DECOMPRESSED_BYTES,
+        )
+    except HTTPException as e:
+        raise HTTPException(e.status_code, f"{filename}: {e.detail}")
+    if suffix != ".zip":
+        return [(filename, suffix, (file_path, stored))]
+
+    try:
+        archive = await run_in_threadpool(zipfile.ZipFile, file_path)
+    except zipfile.BadZipFile as e:
+        delete_file_safe(file_path)
+        raise HTTPException(400, f"{filename}: invalid zip file: {e}")
+    archives.append((archive, file_path))
+    entries = []
+    for member in archive.infolist():
+        if member.is_dir():
+            continue
+        name = os.path.basename(member.filename)[-100:]
+        member_suffix = upload_suffix(name)
+        if member_suffix in (None, ".zip") or not is_supported(
+            UPLOAD_SUFFIXES[member_suffix]
+        ):
+            raise HTTPException(
+                400, f"{filename}/{member.filename}: unsupported file type"
+            )
+        entries.append((name, member_suffix, (archive, member)))
+    return entries
+
+
+async def store_batch_file(entry: tuple, limit: asyncio.Semaphore) -> tuple:
+    """Stream one batch entry to disk; returns (file_path, StoredUpload)."""
+    filename, suffix, source = entry
+    if not isinstance(source[0], zipfile.ZipFile):
+        return source  # stored while the request body streamed
+    file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}{suffix}")
+    async with limit:
+        archive, info = source
+        member = await run_in_threadpool(archive.open, info)
+        try:
+            stored = await save_upload_stream(
+                AsyncFileReader(member),
+                file_path,
+                max_size=MAX_UPLOAD_BYTES,
+                chunk_size=UPLOAD_CHUNK_SIZE,
+                compression=UPLOAD_SUFFIXES[suffix],
+                max_csv_size=MAX_DECOMPRESSED_BYTES,
+            )
+        except HTTPException as e:
+            raise HTTPException(e.status_code, f"{filename}: {e.detail}")
+        finally:
+            await run_in_threadpool(member.close)
+    return file_path, stored
+
+
+def batch_status(counts: Counter, total: int) -> JobStatus:
+    """Aggregate job statuses (see UploadBatchOut)."""
+    unfinished = sum(counts[status] for status in UNFINISHED_STATUSES)
+    if unfinished:
+        if counts[JobStatus.PENDING] == total:
+            return JobStatus.PENDING
+        return JobStatus.PROCESSING
+    if counts[JobStatus.SUCCESS] == total:
+        return JobStatus.SUCCESS
+    if counts[JobStatus.FAILED] == total:
+        return JobStatus.FAILED
+    return JobStatus.PARTIAL
+
+
+async def find_duplicate_job(
+    db: AsyncSession,
+    user_id: int,
+    content_hash: str,
+    schema_id: Optional[int] = None,
+    schema_version: Optional[int] = None,
+) -> Optional[UploadCSV]:
+    """
+    Latest completed job of this user with the same content hash,
+    imported with the same import schema version.
+    """
+    result = await db.scalars(
+        select(UploadCSV)
+        .where(
+            UploadCSV.user_id == user_id,
+            UploadCSV.content_hash == content_hash,
+            UploadCSV.schema_id == schema_id,
+            UploadCSV.schema_version == schema_version,
+            UploadCSV.status.in_((JobStatus.SUCCESS, JobStatus.PARTIAL)),
+        )
+        .order_by(UploadCSV.id.desc())
+        .limit(1)
+    )
+    return result.first()
+
+
+async def get_job_or_404(
+    db: AsyncSession, job_id: int, user: UserSnapshot, allow_admin: bool = False
+) -> UploadCSV:
+    """
+    The user's job, else 404 (other users' jobs are not revealed).
+    allow_admin: admins may read any user's job.
+    """
+    job = await db.get(UploadCSV, job_id)
+    if not job and is_replica(db):
+        # Not replicated yet: the primary is the source of truth
+        async with SessionLocal() as primary:
+            job = await primary.get(UploadCSV, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    if job.user_id != user.id and not (allow_admin and is_admin(user)):
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+# 1b) UPLOAD SEVERAL FILES AT ONCE
+@app.post(
+    "/upload/batch",
+    response_model=BatchUploadResponse,
+    status_code=202,
+    summary="Upload several CSV files (or a zip of them) as one batch",
+    openapi_extra=form_openapi(BatchUploadForm, "files", many=True),
+)
+async def upload_csv_batch(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    """
+    One auth check, one transaction for all jobs, one Celery group.
+    Every file becomes its own job; uploads are not deduplicated.
+    Multipart form: `files` (repeated), plus an optional `schema_id`;
+    parsed as it streams, like POST /upload.
+    """
+    started = time.perf_counter()
+    form = MultipartStream(request, MAX_BATCH_UPLOAD_BYTES)
+    # Fail fast before the body is written to disk
+    await ensure_capacity(db)
+
+    fields, entries, archives = {}, [], []
+    try:
+        try:
+            while part := await form.next_part():
+                if part.filename is None:
+                    fields[part.name] = await form.read_field()
+                    continue
+                if part.name != "files":
+                    raise HTTPException(400, "Send the files as the `files` field")
+                entries.extend(await receive_batch_file(form, part.filename, archives))
+                if len(entries) > MAX_BATCH_FILES:
+                    raise HTTPException(
+                        400, f"Too many files in one batch. Maximum is {MAX_BATCH_FILES}"
+                    )
+            if not entries:
+                raise HTTPException(400, "No files to import")
+            options = parse_form(BatchUploadForm, fields)
+            schema_id = options.schema_id
+            schema_version = await get_schema_version(db, schema_id, current_user)
+            await ensure_capacity(db, jobs=len(entries))
+        except BaseException:
+            for _, _, source in entries:
+                if not isinstance(source[0], zipfile.ZipFile):
+                    delete_file_safe(source[0])
+            raise
+
+        limit = asyncio.Semaphore(BATCH_SAVE_CONCURRENCY)
+        results = await asyncio.gather(
+            *(store_batch_file(entry, limit) for entry in entries),
+            return_exceptions=True,
+        )
+    finally:
+        for archive, zip_path in archives:
+            archive.close()
+            delete_file_safe(zip_path)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        for result in results:
+            if not isinstance(result, BaseException):
+                delete_file_safe(result[0])
+        if isinstance(errors[0], HTTPException):
+            raise errors[0]
+        raise HTTPException(500, f"Failed to store file: {errors[0]}")
+    for _, stored in results:
+        UPLOAD_BYTES.observe(stored.size)
+
+    # Batch record and every job in one transaction
+    batch = UploadBatch(user_id=current_user.id, total_jobs=len(entries))
+    db.add(batch)
+    await db.flush()
+    jobs = [
+        UploadCSV(
+            original_filename=filename,
+            file_path=file_path,
+            status=JobStatus.PENDING,
+            user_id=current_user.id,
+            file_size=stored.size,
+            total_rows=stored.total_rows,
+            content_hash=stored.sha256,
+            schema_id=schema_id,
+            schema_version=schema_version,
+            batch_id=batch.id,
+        )
+        for (filename, _, _), (file_path, stored) in zip(entries, results)
+    ]
+    db.add_all(jobs)
+    await db.commit()
+    for job in jobs:
+        mark_recent_write(job.id)
+    if PARTITIONED:
+        await prepare_job_storage(db, jobs)
+
+    # Fan out; jobs that could not be queued fail right away
+    error = None
+    try:
+        not_enqueued = set(
+            enqueue_imports(
+                [
+                    (job.id, job.file_path, job.total_rows, job.file_size)
+                    for job in jobs
+                ]
+            )
+        )
+    except HTTPException as e:
+        error = e
+        not_enqueued = {job.id for job in jobs}
+    for job in jobs:
+        if job.id in not_enqueued:
+            job.status = JobStatus.FAILED
+            job.error_message = "Not enqueued: " + (
+                error.detail if error else "Import backlog is full. Retry later."
+            )
+            delete_file_safe(job.file_path)
+    if not_enqueued:
+        await db.commit()
+    if error:
+        raise error
+
+    UPLOAD_SECONDS.labels("batch").observe(time.perf_counter() - started)
+    message = f"{len(jobs)} files uploaded. Processing started in background."
+    if not_enqueued:
+        message += f" {len(not_enqueued)} could not be queued (backlog full)."
+    return BatchUploadResponse(
+        batch_id=batch.id,
+        jobs=[
+            BatchUploadJob(
+                job_id=job.id, filename=job.original_filename, status=job.status
+            )
+            for job in jobs
+        ],
+        message=message,
+    )
+
+
+async def load_batch(db: AsyncSession, batch_id: int) -> tuple:
+    """(batch, its jobs by id), or (None, [])."""
+    batch = await db.get(UploadBatch, batch_id)
+    if batch is None:
+        return None, []
+    jobs = await db.scalars(
+        select(UploadCSV).where(UploadCSV.batch_id == batch_id).order_by(UploadCSV.id)
+    )
+    return batch, list(jobs)
+
+
+# 1c) FETCH BATCH STATUS (aggregate + every job)
+@app.get(
+    "/batches/{batch_id}",
+    response_model=UploadBatchOut,
+    summary="Get a batch's aggregated status and its jobs",
+)
+async def get_batch(
+    batch_id: int,
+    db: AsyncSession = Depends(get_db_read),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    batch, jobs = await load_batch(db, batch_id)
+    if batch is None and is_replica(db):
+        # Not replicated yet: the primary is the source of truth
+        async with SessionLocal() as primary:
+            batch, jobs = await load_batch(primary, batch_id)
+    if batch is None or batch.user_id != current_user.id:
+        raise HTTPException(404, "Batch not found")
+
+    counts = Counter(job.status for job in jobs)
+    total_rows = None
+    if all(job.total_rows is not None for job in jobs):
+        total_rows = sum(job.total_rows for job in jobs)
+    return UploadBatchOut(
+        id=batch.id,
+        status=batch_status(counts, len(jobs)),
+        created_at=batch.created_at,
+        total_jobs=batch.total_jobs,
+        counts=counts,
+        total_rows=total_rows,
+        rows_processed=sum(job.rows_processed or 0 for job in jobs),
+        rows_rejected=sum(job.rows_rejected or 0 for job in jobs),
+        jobs=jobs,
+    )
+
+
+# 1d) RESUMABLE UPLOADS (tus-style: create, PATCH at offset, finalize)
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _session_expiry() -> datetime:
+    return _utcnow() + timedelta(hours=UPLOAD_SESSION_TTL_HOURS)
+
+
+def _create_empty_file(file_path: str):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    open(file_path, "wb").close()
+
+
+async def get_upload_session_or_404(
+    db: AsyncSession, upload_id: str, user: UserSnapshot
+) -> UploadSession:
+    # Fresh from the database: locks change it behind the session's back
+    upload = await db.get(UploadSession, upload_id, populate_existing=True)
+    if not upload or upload.user_id != user.id or upload.expires_at < _utcnow():
+        raise HTTPException(404, "Upload not found")
+    return upload
+
+
+def _offset_headers(upload: UploadSession) -> dict:
+    return {
+        "Upload-Offset": str(upload.offset),
+        "Upload-Length": str(upload.size),
+        "Cache-Control": "no-store",
+    }
+
+
+@app.post(
+    "/uploads",
+    response_model=UploadSessionOut,
+    status_code=201,
+    summary="Start a resumable upload",
+)
+async def create_upload_session(
+    data: UploadSessionCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    suffix = check_upload_suffix(data.filename)
+    if data.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            413, f"File too large. Maximum allowed size is {MAX_UPLOAD_BYTES} bytes"
+        )
+    await get_schema_version(db, data.schema_id, current_user)
+
+    upload_id = uuid.uuid4().hex
+    file_path = os.path.join(UPLOAD_SESSION_DIR, f"{upload_id}{suffix}")
+    await run_in_threadpool(_create_empty_file, file_path)
+    upload = UploadSession(
+        id=upload_id,
+        user_id=current_user.id,
+        filename=data.filename,
+        file_path=file_path,
+        size=data.size,
+        offset=0,
+        schema_id=data.schema_id,
+        expires_at=_session_expiry(),
+    )
+    db.add(upload)
+    await db.commit()
+    response.headers["Location"] = f"/uploads/{upload_id}"
+    return upload
+
+
+@app.get(
+    "/uploads/{upload_id}",
+    response_model=UploadSessionOut,
+    summary="Get a resumable upload's progress",
+)
+async def get_upload_session(
+    upload_id: str,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    upload = await get_upload_session_or_404(db, upload_id, current_user)
+    response.headers.update(_offset_headers(upload))
+    return upload
+
+
+@app.head("/uploads/{upload_id}", summary="Offset to resume a resumable upload at")
+async def head_upload_session(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    upload = await get_upload_session_or_404(db, upload_id, current_user)
+    return Response(headers=_offset_headers(upload))
+
+
+def check_upload_offset(upload: UploadSession, offset: int):
+    """409 unless a PATCH may write at `offset`."""
+    if upload.job_id is not None:
+        raise HTTPException(409, "Upload already finalized")
+    if offset != upload.offset:
+        raise HTTPException(
+            409,
+            f"Upload-Offset {offset} does not match the stored offset",
+            headers=_offset_headers(upload),
+        )
+
+
+def _upload_busy(upload: UploadSession) -> HTTPException:
+    return HTTPException(
+        409, "Upload is in use by another request", headers=_offset_headers(upload)
+    )
+
+
+async def lock_upload_session(
+    db: AsyncSession, upload_id: str, token: str, *conditions
+) -> bool:
+    """
+    Take an unfinalized upload's lock, if it is free (or its holder's
+    lease ran out) and `conditions` hold. One conditional UPDATE, so two
+    requests never both get it.
+    """
+    now = _utcnow()
+    result = await db.execute(
+        update(UploadSession)
+        .where(
+            UploadSession.id == upload_id,
+            UploadSession.job_id.is_(None),
+            or_(UploadSession.lock_token.is_(None), UploadSession.locked_until < now),
+            *conditions,
+        )
+        .values(
+            lock_token=token,
+            locked_until=now + timedelta(seconds=UPLOAD_SESSION_LOCK_SECONDS),
+        )
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def unlock_upload_session(
+    db: AsyncSession, upload_id: str, token: str, **values
+) -> bool:
+    """Release the lock, applying `values`; False if it was taken over."""
+    result = await db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload_id, UploadSession.lock_token == token)
+        .values(lock_token=None, locked_until=None, **values)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+def _write_part(part_path: str, file_path: str, offset: int):
+    with open(part_path, "rb") as src, open(file_path, "r+b") as dst:
+        dst.seek(offset)
+        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+
+
+@app.patch(
+    "/uploads/{upload_id}",
+    status_code=204,
+    summary="Append the request body at Upload-Offset",
+)
+async def patch_upload_session(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    """
+    The body is received into a part file of this request's own. Only
+    then is the upload locked at that offset and the part copied in, so
+    a request that loses a race (e.g. a client retry while the first
+    attempt still streams) never touches the stored bytes.
+
+    Bytes that arrived before a client disconnect are kept: a retry asks
+    HEAD for the offset and sends the rest. A body going past the
+    declared size is refused whole (413): by its Content-Length before
+    it is read, or as soon as a chunked body overruns.
+    """
+    upload = await get_upload_session_or_404(db, upload_id, current_user)
+    check_upload_offset(upload, upload_offset)
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and upload_offset + int(length) > upload.size:
+        raise HTTPException(413, "Chunk goes past the declared upload size")
+
+    start, written = upload.offset, 0
+    token = uuid.uuid4().hex
+    part_path = f"{upload.file_path}.{token}.part"
+    try:
+        fp = await run_in_threadpool(open, part_path, "wb")
+        try:
+            async for chunk in request.stream():
+                if start + written + len(chunk) > upload.size:
+                    raise HTTPException(413, "Chunk goes past the declared upload size")
+                await run_in_threadpool(fp.write, chunk)
+                written += len(chunk)
+        except ClientDisconnect:
+            pass  # keep what arrived
+        finally:
+            await run_in_threadpool(fp.close)
+
+        if written:
+            if not await lock_upload_session(
+                db, upload_id, token, UploadSession.offset == start
+            ):
+                upload = await get_upload_session_or_404(db, upload_id, current_user)
+                check_upload_offset(upload, start)
+                raise _upload_busy(upload)
+            try:
+                await run_in_threadpool(_write_part, part_path, upload.file_path, start)
+            except Exception:
+                await unlock_upload_session(db, upload_id, token)
+                raise
+            if not await unlock_upload_session(
+                db,
+                upload_id,
+                token,
+                offset=start + written,
+                expires_at=_session_expiry(),
+            ):
+                raise HTTPException(409, "Upload was modified by another request")
+    finally:
+        delete_file_safe(part_path)
+
+    return Response(
+        status_code=204,
+        headers={"Upload-Offset": str(start + written), "Cache-Control": "no-store"},
+    )
+
+
+async def finalized_upload(
+    db: AsyncSession, upload: UploadSession, response: Response
+) -> UploadResponse:
+    job = await db.get(UploadCSV, upload.job_id)
+    response.status_code = 200
+    return UploadResponse(
+        job_id=job.id, status=job.status, message="Upload already finalized."
+    )
+
+
+@app.post(
+    "/uploads/{upload_id}/finalize",
+    response_model=UploadResponse,
+    status_code=202,
+    summary="Turn a complete resumable upload into an import job",
+)
+async def finalize_upload_session(
+    upload_id: str,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    """
+    Same checks, deduplication and hand-off as POST /upload, under the
+    upload's lock: no PATCH writes and no other finalize runs meanwhile.
+    Finalizing again returns the job.
+    """
+    started = time.perf_counter()
+    upload = await get_upload_session_or_404(db, upload_id, current_user)
+    if upload.job_id is not None:
+        return await finalized_upload(db, upload, response)
+
+    token = uuid.uuid4().hex
+    locked = await lock_upload_session(
+        db, upload_id, token, UploadSession.offset == UploadSession.size
+    )
+    upload = await get_upload_session_or_404(db, upload_id, current_user)
+    if not locked:
+        if upload.job_id is not None:
+            return await finalized_upload(db, upload, response)
+        if upload.offset != upload.size:
+            raise HTTPException(
+                409,
+                f"Upload incomplete: {upload.offset} of {upload.size} bytes received",
+                headers=_offset_headers(upload),
+            )
+        raise _upload_busy(upload)
+
+    try:
+        schema_version = await get_schema_version(db, upload.schema_id, current_user)
+        await ensure_capacity(db)
+
+        suffix = upload_suffix(upload.filename)
+        try:
+            stored = await run_in_threadpool(
+                scan_stored_upload,
+                upload.file_path,
+                UPLOAD_CHUNK_SIZE,
+                UPLOAD_SUFFIXES[suffix],
+                MAX_DECOMPRESSED_BYTES,
+            )
+        except HTTPException:
+            # Corrupt data cannot be fixed by resuming
+            delete_file_safe(upload.file_path)
+            await db.delete(upload)
+            await db.commit()
+            raise
+        UPLOAD_BYTES.observe(stored.size)
+
+        # Same directory as direct uploads; the chunks are already one file
+        file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}{suffix}")
+        await run_in_threadpool(os.replace, upload.file_path, file_path)
+        upload.file_path = file_path
+        try:
+            result = await create_import_job(
+                db,
+                response,
+                current_user,
+                upload.filename,
+                file_path,
+                stored,
+                schema_id=upload.schema_id,
+                schema_version=schema_version,
+            )
+        except HTTPException:
+            await db.delete(upload)
+            await db.commit()
+            raise
+    except Exception:
+        # No-op when the session was deleted above
+        await unlock_upload_session(db, upload_id, token)
+        raise
+
+    # Kept for a while so a finalize retry gets the job back
+    upload.job_id = result.job_id
+    upload.lock_token = upload.locked_until = None
+    upload.expires_at = _session_expiry()
+    await db.commit()
+    UPLOAD_SECONDS.labels("resumable").observe(time.perf_counter() - started)
+    return result
+
+
+@app.delete(
+    "/uploads/{upload_id}",
+    status_code=204,
+    summary="Abort a resumable upload",
+)
+async def delete_upload_session(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    upload = await get_upload_session_or_404(db, upload_id, current_user)
+    if upload.job_id is None:
+        # Not while a PATCH or finalize holds it
+        if not await lock_upload_session(db, upload_id, uuid.uuid4().hex):
+            upload = await get_upload_session_or_404(db, upload_id, current_user)
+            raise _upload_busy(upload)
+        delete_file_safe(upload.file_path)
+    await db.delete(upload)
+    await db.commit()
+    return Response(status_code=204)
+
+
+# 2) FETCH JOB STATUS (metadata + counts only)
 @app.get(
     "/jobs/{job_id}",
     response_model=UploadCSVOut,
-    summary="Get job status and processed CSV data",
+    summary="Get job status and progress",
 )
 async def get_job(
     job_id: int,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db_read),
+    current_user: UserSnapshot = Depends(get_current_active_user),
 ):
+    return await get_job_or_404(db, job_id, current_user)
+
+
+# 3) FETCH PROCESSED ROWS (keyset pagination on the row id)
+@app.get(
+    "/jobs/{job_id}/rows",
+    response_model=CSVRowPage,
+    summary="Page through processed CSV rows",
+)
+async def get_job_rows(
+    job_id: int,
+    after_id: int = Query(0, ge=0, description="Cursor: last row id of the previous page"),
+    limit: int = Query(100, ge=1, le=ROWS_PAGE_MAX),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated columns to return, e.g. name,role"
+    ),
+    db: AsyncSession = Depends(get_db_read),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    await get_job_or_404(db, job_id, current_user)
+
+    columns = list(CSV_ROW_FIELDS)
+    if fields:
+        columns = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = set(columns) - set(CSV_ROW_FIELDS)
+        if unknown:
+            raise HTTPException(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    table = csv_data_table(job_id)
     query = (
-        select(UploadCSV)
-        .options(selectinload(UploadCSV.csv_data))
-        .where(UploadCSV.id == job_id)
-        # .where(UploadCSV.user_id == current_user.id)
+        select(table.c.id, *(table.c[name] for name in columns))
+        .where(table.c.job_id == job_id, table.c.id > after_id)
+        .order_by(table.c.id)
+        .limit(limit + 1)
     )
-    # result = await db.execute(select(UploadCSV).where(UploadCSV.id == job_id))
     result = await db.execute(query)
-    # print("GET JOB", result)
-    job = result.scalars().unique().first()
+    rows = [decode_extras(dict(row._mapping)) for row in result]
 
-    if not job:
-        raise HTTPException(404, "Job not found")
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1]["id"]
 
-    return job
+    return CSVRowPage(job_id=job_id, rows=rows, next_cursor=next_cursor)
+
+
+# 3b) FETCH REJECTED ROWS (keyset pagination on CSVReject.id)
+@app.get(
+    "/jobs/{job_id}/rejects",
+    response_model=CSVRejectPage,
+    summary="Page through rows rejected during import, with reasons",
+)
+async def get_job_rejects(
+    job_id: int,
+    after_id: int = Query(0, ge=0, description="Cursor: last reject id of the previous page"),
+    limit: int = Query(100, ge=1, le=ROWS_PAGE_MAX),
+    db: AsyncSession = Depends(get_db_read),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    await get_job_or_404(db, job_id, current_user)
+
+    result = await db.scalars(
+        select(CSVReject)
+        .where(CSVReject.job_id == job_id, CSVReject.id > after_id)
+        .order_by(CSVReject.id)
+        .limit(limit + 1)
+    )
+    rejects = list(result)
+
+    next_cursor = None
+    if len(rejects) > limit:
+        rejects = rejects[:limit]
+        next_cursor = rejects[-1].id
+
+    return CSVRejectPage(job_id=job_id, rejects=rejects, next_cursor=next_cursor)
+
+
+# 4) EXPORT ALL ROWS (streamed)
+@app.get(
+    "/jobs/{job_id}/export",
+    summary="Stream processed CSV rows as NDJSON or CSV",
+)
+async def export_job(
+    job_id: int,
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    gzip: bool = Query(False, description="Compress the stream on the fly"),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    await get_job_or_404(db, job_id, current_user)
+
+    filename = f"job-{job_id}.{format}"
+    media_type = EXPORT_MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        iter_job_export(job_id, format, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# 4b) IMPORT PROFILE (admins, jobs uploaded with `profile`)
+@app.get(
+    "/jobs/{job_id}/profile",
+    summary="Download the job's import profile (pstats or collapsed stacks)",
+)
+async def get_job_profile(
+    job_id: int,
+    db: AsyncSession = Depends(get_db_read),
+    current_user: UserSnapshot = Depends(get_current_admin_user),
+):
+    await get_job_or_404(db, job_id, current_user, allow_admin=True)
+
+    found = find_profile(job_id)
+    if found is None:
+        raise HTTPException(404, "No profile recorded for this job")
+    mode, path = found
+    if mode == "cprofile":
+        return FileResponse(
+            path, media_type="application/octet-stream", filename=f"job-{job_id}.pstats"
+        )
+    return FileResponse(
+        path, media_type="text/plain", filename=f"job-{job_id}.collapsed"
+    )
+
+
+# 5) PUSH JOB STATUS (Server-Sent Events)
+@app.get(
+    "/jobs/{job_id}/events",
+    summary="Stream job status and progress as Server-Sent Events",
+)
+async def job_events(
+    job_id: int,
+    db: AsyncSession = Depends(get_db_read),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    await get_job_or_404(db, job_id, current_user)
+    await db.close()  # the stream can be long-lived; do not hold a connection
+
+    async def stream():
+        async for event in iter_job_events(job_id):
+            yield format_sse(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# 6) PUSH JOB STATUS (WebSocket, token passed as ?token=...)
+@app.websocket("/jobs/{job_id}/ws")
+async def job_events_ws(
+    websocket: WebSocket,
+    job_id: int,
+    token: str = Query(...),
+    db: AsyncSession = Depends(get_db_read),
+):
+    try:
+        user = await authenticate_token(token, db)
+        await get_job_or_404(db, job_id, user)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not user.is_active:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await db.close()  # the stream can be long-lived; do not hold a connection
+
+    await websocket.accept()
+    try:
+        async for event in iter_job_events(job_id):
+            if event is not None:
+                await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+# Prometheus scrape endpoint (see app.metrics)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 
 # Root
@@ -120,5 +1241,5 @@ def root():
 
 
 @app.get("/secret")
-async def secret(current_user: User = Depends(get_current_active_user)):
+async def secret(current_user: UserSnapshot = Depends(get_current_active_user)):
     return {"message": f"Welcome {current_user.email}!"}
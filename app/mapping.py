@@ -0,0 +1,185 @@
+"""
+This module compiles import schemas into row converters.
+
+An ImportSchema maps CSV headers onto the CSVData columns name, role,
+loc and extra; any other target lands in the JSON `extras` column.
+Each schema version is compiled once into a RowConverter and cached, so
+the worker converts a batch column by column instead of walking the
+schema definition for every row.
+"""
+
+import json
+import math
+from datetime import date, datetime
+from typing import Dict, List, Sequence, Tuple
+
+from decouple import config
+
+from .cache import TTLCache
+from .models import ImportSchema
+
+
+CONVERTER_CACHE_SIZE = config("CONVERTER_CACHE_SIZE", default=256, cast=int)
+# A schema update bumps its version, so compiled converters never go
+# stale; the TTL only bounds how long unused ones stay resident
+CONVERTER_CACHE_TTL = 3600
+
+# CSVData columns a schema can target; every other target is an extras key
+CORE_FIELDS = ("name", "role", "loc", "extra")
+OUTPUT_FIELDS = CORE_FIELDS + ("extras",)
+
+_TRUE = frozenset(("true", "t", "yes", "y", "1"))
+_FALSE = frozenset(("false", "f", "no", "n", "0"))
+
+
+def _boolean(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    raise ValueError(value)
+
+
+def _float(value: str) -> float:
+    """inf/nan parse as floats but have no JSON form (the rows endpoint)."""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+
+# type name -> str -> value; None means the text is kept as is
+CASTS = {
+    "string": None,
+    "integer": int,
+    "float": _float,
+    "boolean": _boolean,
+    "date": lambda value: date.fromisoformat(value).isoformat(),
+    "datetime": lambda value: datetime.fromisoformat(value).isoformat(),
+}
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def _text(value) -> str:
+    """Typed values in text columns are stored as JSON literals (42, true)."""
+    return value if isinstance(value, str) else _encode(value)
+
+
+class RowConverter:
+    """
+    Convert batches of (row_number, values), values ordered like
+    `sources`, into (row_number, OUTPUT_FIELDS values).
+
+    -> Empty or missing values take the column's default
+    -> Values that do not convert, and missing required values, are
+       reported per batch index in `reasons` (first reason wins)
+    """
+
+    def __init__(self, columns: Sequence[dict]):
+        self.sources = tuple(dict.fromkeys(column["source"] for column in columns))
+        positions = {source: i for i, source in enumerate(self.sources)}
+        self.core: Dict[str, tuple] = {}
+        self.extras: List[tuple] = []
+        for column in columns:
+            type_name = column.get("type") or "string"
+            if type_name not in CASTS:
+                raise ValueError(f"{column['target']}: unknown type {type_name!r}")
+            cast = CASTS[type_name]
+            default = column.get("default")
+            if default is not None and cast is not None:
+                try:
+                    default = cast(default)
+                except ValueError:
+                    raise ValueError(
+                        f"{column['target']}: default {default!r} is not a valid "
+                        f"{type_name}"
+                    )
+            step = (
+                positions[column["source"]],
+                column["target"],
+                type_name,
+                cast,
+                default,
+                bool(column.get("required")),
+            )
+            if column["target"] in CORE_FIELDS:
+                self.core[column["target"]] = step
+            else:
+                self.extras.append(step)
+
+    @staticmethod
+    def _column(batch: List[tuple], step: tuple, reasons: Dict[int, str]) -> list:
+        index, target, type_name, cast, default, required = step
+        raw = [values[index] for _, values in batch]
+        if cast is None:
+            column = [value or default for value in raw]
+        else:
+            try:
+                column = [cast(value) if value else default for value in raw]
+            except (ValueError, OverflowError):
+                # Rare: redo the column row by row to find the bad values
+                column = []
+                for i, value in enumerate(raw):
+                    try:
+                        column.append(cast(value) if value else default)
+                    except (ValueError, OverflowError):
+                        reasons.setdefault(
+                            i, f"{target}: not a valid {type_name}: {value!r}"
+                        )
+                        column.append(None)
+        if required and None in column:
+            for i, value in enumerate(column):
+                if value is None:
+                    reasons.setdefault(i, f"{target}: required")
+        return column
+
+    def convert(
+        self, batch: List[Tuple[int, tuple]], reasons: Dict[int, str]
+    ) -> List[Tuple[int, tuple]]:
+        empty = [None] * len(batch)
+        columns = []
+        for field in CORE_FIELDS:
+            step = self.core.get(field)
+            if step is None:
+                columns.append(empty)
+                continue
+            column = self._column(batch, step, reasons)
+            if step[3] is not None:
+                column = [None if value is None else _text(value) for value in column]
+            columns.append(column)
+
+        if self.extras:
+            keys = [step[1] for step in self.extras]
+            objects = (
+                {key: value for key, value in zip(keys, values) if value is not None}
+                for values in zip(
+                    *(self._column(batch, step, reasons) for step in self.extras)
+                )
+            )
+            columns.append([_encode(obj) if obj else None for obj in objects])
+        else:
+            columns.append(empty)
+
+        return list(zip((row_number for row_number, _ in batch), zip(*columns)))
+
+
+_converters = TTLCache(maxsize=CONVERTER_CACHE_SIZE, ttl=CONVERTER_CACHE_TTL)
+
+
+def get_converter(schema: ImportSchema) -> RowConverter:
+    """Compiled converter for this version of the schema (cached)."""
+    key = (schema.id, schema.version)
+    converter = _converters.get(key)
+    if converter is None:
+        converter = RowConverter(schema.columns)
+        _converters.set(key, converter)
+    return converter
+
+
+def decode_extras(row: dict) -> dict:
+    """Turn a row's stored extras JSON back into an object, in place."""
+    if row.get("extras"):
+        row["extras"] = json.loads(row["extras"])
+    return row
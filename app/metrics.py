@@ -0,0 +1,141 @@
+"""
+This module contains the Prometheus metrics shared across the app
+
+With PROMETHEUS_MULTIPROC_DIR set (before prometheus_client is first
+imported), every API and worker process writes its samples there and
+GET /metrics aggregates them. The directory must be shared by the API
+and the Celery workers, and emptied before they start.
+"""
+
+import os
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+_SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_LONG_SECONDS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Time to hash or verify a password, including executor queueing",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.5, 5.0),
+)
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "Password hash/verify operations queued or running",
+    multiprocess_mode="livesum",
+)
+
+# API: uploads
+UPLOAD_BYTES = Histogram(
+    "upload_bytes",
+    "Size of stored uploads, as sent (compressed files stay compressed)",
+    buckets=tuple(1024 * 4**i for i in range(12)),  # 1 KiB .. 4 GiB
+)
+UPLOAD_SECONDS = Histogram(
+    "upload_seconds",
+    "Upload handling time, by outcome (created / deduplicated / batch / resumable)",
+    ["outcome"],
+    buckets=_SECONDS,
+)
+
+# Worker: import pipeline
+QUEUE_WAIT_SECONDS = Histogram(
+    "task_queue_wait_seconds",
+    "Time from enqueue (or ETA, for retries) until a worker starts the task",
+    ["task"],
+    buckets=_LONG_SECONDS,
+)
+IMPORT_PARSE_SECONDS = Histogram(
+    "import_parse_seconds",
+    "Time per job spent waiting on the CSV reader",
+    buckets=_LONG_SECONDS,
+)
+INSERT_BATCH_SECONDS = Histogram(
+    "import_insert_batch_seconds",
+    "Latency of one batched INSERT (before its commit)",
+    buckets=_SECONDS,
+)
+IMPORT_ROWS_PER_SECOND = Histogram(
+    "import_rows_per_second",
+    "Throughput of finished import jobs",
+    buckets=(100, 500, 1000, 5000, 10_000, 25_000, 50_000, 100_000, 250_000),
+)
+TASK_RETRIES = Counter("task_retries", "Celery task retries scheduled", ["task"])
+TASK_FAILURES = Counter("task_failures", "Celery tasks that failed for good", ["task"])
+
+# Both: database
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the SQLAlchemy pool",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+
+class CacheCollector:
+    """Expose a TTLCache's stats() (see app.cache) under `name`."""
+
+    def __init__(self, name: str, cache):
+        self.name = name
+        self.cache = cache
+
+    def collect(self):
+        stats = self.cache.stats()
+        size = GaugeMetricFamily(f"{self.name}_size", "Cached entries")
+        size.add_metric([], stats["size"])
+        yield size
+        for key in ("hits", "misses", "evictions"):
+            counter = CounterMetricFamily(f"{self.name}_{key}", f"Cache {key}")
+            counter.add_metric([], stats[key])
+            yield counter
+
+
+# In-process collectors, added to every scrape of this process
+_process_collectors = []
+
+
+def register_process_collector(collector):
+    """
+    Register a custom collector. Its values are this process's only: in
+    multiprocess mode they are not aggregated across processes.
+    """
+    _process_collectors.append(collector)
+    if not MULTIPROC_DIR:
+        REGISTRY.register(collector)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition body and content type for GET /metrics."""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _process_collectors:
+            registry.register(collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Drop a finished worker process's live gauges (multiprocess mode)."""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
@@ -1,19 +1,48 @@
 import enum
+import logging
 from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
 from sqlalchemy import (
     Column,
     Integer,
+    BigInteger,
     String,
     Enum,
     DateTime,
     ForeignKey,
     Text,
     Boolean,
+    Float,
+    JSON,
+    Index,
+    UniqueConstraint,
+    MetaData,
+    Table,
+    DDL,
+    event,
+    text,
     func,
+    select,
 )
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .database import Base
+from .database import Base, sync_engine
+from .config import (
+    CSV_DATA_STORAGE,
+    CSV_DATA_PARTITION_JOBS,
+    CSV_DATA_PARTITIONS_AHEAD,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+# Partitioned CSVData storage (see CSV_DATA_STORAGE)
+PARTITIONED = CSV_DATA_STORAGE == "partitioned"
+RANGE_PARTITIONED = PARTITIONED and sync_engine.dialect.name == "mysql"
+PER_JOB_TABLES = PARTITIONED and not RANGE_PARTITIONED
 
 
 class User(Base):
@@ -32,9 +61,59 @@ class JobStatus(str, enum.Enum):
     PENDING = "PENDING"
     PROCESSING = "PROCESSING"
     SUCCESS = "SUCCESS"
+    # Finished, but some rows were rejected (see CSVReject)
+    PARTIAL = "PARTIAL"
+    # An attempt failed and the task is queued to retry (autoretry)
+    RETRYING = "RETRYING"
     FAILED = "FAILED"
 
 
+# Jobs that still hold their upload and will (re)run the import
+UNFINISHED_STATUSES = (JobStatus.PENDING, JobStatus.PROCESSING, JobStatus.RETRYING)
+
+
+class ImportSchema(Base):
+    """
+    User-defined mapping of CSV headers onto CSVData columns. `columns`
+    holds a list of {source, target, type, default, required}; targets
+    other than name/role/loc/extra are stored in CSVData.extras.
+    Every update bumps `version`.
+    """
+
+    __tablename__ = "import_schemas"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String(100), nullable=False)
+    version = Column(Integer, default=1, nullable=False)
+    columns = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "name", name="uq_import_schemas_user_id_name"),
+    )
+
+
+class UploadBatch(Base):
+    """
+    Files uploaded together through POST /upload/batch. Its status is
+    aggregated from the jobs' statuses when read, never stored.
+    """
+
+    __tablename__ = "upload_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    total_jobs = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    jobs = relationship("UploadCSV", back_populates="batch")
+
+
 class UploadCSV(Base):
     __tablename__ = "upload_jobs"
 
@@ -43,6 +122,27 @@ class UploadCSV(Base):
     original_filename = Column(String(100), nullable=False)
     status = Column(Enum(JobStatus), default=JobStatus.PENDING, nullable=False)
     error_message = Column(Text, nullable=True)
+    # Computed while the upload is streamed to disk
+    file_size = Column(BigInteger, nullable=True)
+    total_rows = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    # Import schema (and the version of it) the file is converted with;
+    # None keeps the built-in name/role/location/extra_info mapping
+    schema_id = Column(Integer, ForeignKey("import_schemas.id"), nullable=True)
+    schema_version = Column(Integer, nullable=True)
+    # Set for files uploaded through POST /upload/batch
+    batch_id = Column(Integer, ForeignKey("upload_batches.id"), nullable=True)
+    # Written by the worker while the import runs
+    rows_processed = Column(Integer, default=0, nullable=False)
+    rows_rejected = Column(Integer, default=0, nullable=False)
+    bytes_processed = Column(BigInteger, default=0, nullable=False)
+    rows_per_sec = Column(Float, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Resume point for retries: data row checkpoint_row + 1 starts at byte
+    # checkpoint_offset, and every row before it is committed
+    checkpoint_offset = Column(BigInteger, nullable=True)
+    checkpoint_row = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(
         DateTime,
@@ -51,18 +151,288 @@ class UploadCSV(Base):
     )
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="upload_jobs")
-    csv_data = relationship("CSVData", back_populates="upload_csv")
+    batch = relationship("UploadBatch", back_populates="jobs")
+    csv_data = relationship(
+        "CSVData",
+        back_populates="upload_csv",
+        primaryjoin="UploadCSV.id == foreign(CSVData.job_id)",
+    )
+
+    # Duplicate-upload lookup: same user, same content hash
+    __table_args__ = (
+        Index("ix_upload_jobs_user_id_content_hash", "user_id", "content_hash"),
+        Index("ix_upload_jobs_batch_id", "batch_id"),
+    )
+
+
+class UploadSession(Base):
+    """
+    Resumable upload (POST /uploads). `offset` bytes of file_path are
+    stored; the finalize step turns the complete file into `job_id`.
+    A request holds lock_token (until locked_until, in case it dies)
+    while it writes to file_path or finalizes it.
+    """
+
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    filename = Column(String(100), nullable=False)
+    file_path = Column(String(255), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    offset = Column(BigInteger, default=0, nullable=False)
+    schema_id = Column(Integer, ForeignKey("import_schemas.id"), nullable=True)
+    job_id = Column(Integer, ForeignKey("upload_jobs.id"), nullable=True)
+    lock_token = Column(String(32), nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+    expires_at = Column(DateTime, nullable=False, index=True)
 
 
 class CSVData(Base):
     __tablename__ = "csv_data"
 
-    id = Column(Integer, primary_key=True, index=True)
-    job_id = Column(Integer, ForeignKey("upload_jobs.id"), index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    if RANGE_PARTITIONED:
+        # MySQL: the partition key must be part of the primary key, and
+        # partitioned tables cannot have foreign keys
+        job_id = Column(Integer, primary_key=True, autoincrement=False)
+    else:
+        job_id = Column(Integer, ForeignKey("upload_jobs.id"))
+    # 1-based position of the row in the uploaded file
+    row_number = Column(Integer, nullable=True)
     # Example: we store specific columns as text; you can adapt to your schema.
     name = Column(String(100), nullable=True)
     role = Column(String(100), nullable=True)
     loc = Column(String(100), nullable=True)
     extra = Column(String(100), nullable=True)
+    # Compact JSON object of import schema columns without a column here
+    extras = Column(Text, nullable=True)
+
+    upload_csv = relationship(
+        "UploadCSV",
+        back_populates="csv_data",
+        primaryjoin="UploadCSV.id == foreign(CSVData.job_id)",
+    )
+
+    __table_args__ = (
+        # Serves both per-job lookups and keyset pagination on id
+        Index("ix_csv_data_job_id_id", "job_id", "id"),
+        # Makes re-inserting rows of a retried import a no-op
+        UniqueConstraint(
+            "job_id", "row_number", name="uq_csv_data_job_id_row_number"
+        ),
+    )
+
+
+
+class CSVReject(Base):
+    """A row that failed validation or was refused by the database."""
+
+    __tablename__ = "csv_rejects"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("upload_jobs.id"), nullable=False)
+    # None for rows the parser dropped before numbering them
+    row_number = Column(Integer, nullable=True)
+    reason = Column(String(255), nullable=False)
+    data = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_csv_rejects_job_id_id", "job_id", "id"),
+        # Re-validating rows of a retried import adds no duplicates
+        UniqueConstraint(
+            "job_id", "row_number", name="uq_csv_rejects_job_id_row_number"
+        ),
+    )
+
+if RANGE_PARTITIONED:
+    event.listen(
+        CSVData.__table__,
+        "after_create",
+        DDL(
+            "ALTER TABLE csv_data PARTITION BY RANGE (job_id) "
+            "(PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        ),
+    )
+
+# MySQL's limit on partitions per table
+MYSQL_MAX_PARTITIONS = 8192
+
+
+def csv_data_table(job_id: int) -> Table:
+    """
+    Table holding a job's rows.
+    -> shared / MySQL partitioned: csv_data (filter on job_id)
+    -> SQLite partitioned: csv_data_<job_id>, same columns as csv_data
+    """
+    if not PER_JOB_TABLES:
+        return CSVData.__table__
+    return _job_table(job_id)
+
+
+@lru_cache(maxsize=256)
+def _job_table(job_id: int) -> Table:
+    # A MetaData of its own: nothing global keeps one Table per job alive,
+    # and create_all (Base.metadata) never sees them
+    return Table(
+        f"csv_data_{job_id}",
+        MetaData(),
+        *(
+            Column(
+                column.name,
+                column.type,
+                primary_key=column.name == "id",
+                nullable=column.nullable,
+            )
+            for column in CSVData.__table__.columns
+        ),
+        UniqueConstraint("job_id", "row_number"),
+    )
+
+
+def _partition_for(job_id: int):
+    """(start, exclusive end) of the job id range that holds job_id."""
+    start = job_id // CSV_DATA_PARTITION_JOBS * CSV_DATA_PARTITION_JOBS
+    return start, start + CSV_DATA_PARTITION_JOBS
+
+
+def _partition_bounds(connection: Connection) -> list:
+    """[(name, upper bound)] of csv_data's partitions, pmax excluded."""
+    result = connection.execute(
+        text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION "
+            "FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'csv_data' "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        )
+    )
+    return [
+        (name, int(description))
+        for name, description in result
+        if description and description != "MAXVALUE"
+    ]
+
+
+def _own_partition(connection: Connection, job_id: int) -> Optional[str]:
+    """
+    Name of the partition holding job_id, if it holds nothing outside the
+    job's range (so dropping it cannot touch other ranges).
+    """
+    start, end = _partition_for(job_id)
+    lower = 1  # job ids start at 1
+    for name, upper in _partition_bounds(connection):
+        if upper > job_id:
+            return name if upper == end and lower >= start else None
+        lower = upper
+    return None
+
+
+def extend_partitions(
+    connection: Connection, ahead: int = CSV_DATA_PARTITIONS_AHEAD
+) -> int:
+    """
+    Carve ranges out of pmax, up to `ahead` ranges past the newest job's,
+    in one REORGANIZE; returns how many were added. Run out of band (see
+    app.partitioning): the DDL waits for running inserts on csv_data.
+    Jobs past the last range land in pmax until then (rows stay correct,
+    they are just deleted instead of dropped).
+    """
+    newest = connection.execute(select(func.max(UploadCSV.id))).scalar() or 0
+    start, _ = _partition_for(newest)
+    target = start + (ahead + 1) * CSV_DATA_PARTITION_JOBS
+    bounds = _partition_bounds(connection)
+    lower = max((upper for _, upper in bounds), default=1)
+    partitions = []
+    while lower < target and len(bounds) + len(partitions) + 2 <= MYSQL_MAX_PARTITIONS:
+        # Ids between the last range and the newest job's share one partition
+        upper = max(
+            (lower // CSV_DATA_PARTITION_JOBS + 1) * CSV_DATA_PARTITION_JOBS, start
+        )
+        partitions.append(f"PARTITION p{lower} VALUES LESS THAN ({upper})")
+        lower = upper
+    if lower < target:
+        logger.warning(
+            f"[PARTITIONS] csv_data is at MySQL's {MYSQL_MAX_PARTITIONS} partition "
+            f"limit; raise CSV_DATA_PARTITION_JOBS"
+        )
+    if not partitions:
+        return 0
+    partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    connection.exec_driver_sql(
+        f"ALTER TABLE csv_data REORGANIZE PARTITION pmax INTO "
+        f"({', '.join(partitions)})"
+    )
+    return len(partitions) - 1
+
+
+def drop_unused_partitions(connection: Connection) -> int:
+    """
+    Drop ranges entirely below the oldest remaining job: retention has
+    purged their jobs, and job ids are never reused. Returns the count.
+    """
+    oldest = connection.execute(select(func.min(UploadCSV.id))).scalar()
+    if oldest is None:
+        return 0
+    names = [name for name, upper in _partition_bounds(connection) if upper <= oldest]
+    if names:
+        connection.exec_driver_sql(
+            f"ALTER TABLE csv_data DROP PARTITION {', '.join(names)}"
+        )
+    return len(names)
+
+
+def maintain_partitions(connection: Connection) -> tuple:
+    """(ranges added, ranges dropped); a no-op unless RANGE_PARTITIONED."""
+    if not RANGE_PARTITIONED:
+        return 0, 0
+    return extend_partitions(connection), drop_unused_partitions(connection)
+
+
+def ensure_job_storage(connection: Connection, job_id: int):
+    """
+    Create the job's table if missing (SQLite partitioned). Idempotent.
+    MySQL ranges are created ahead of time by maintain_partitions, never
+    on the upload path.
+    """
+    if PER_JOB_TABLES:
+        csv_data_table(job_id).create(connection, checkfirst=True)
+
+
+def clear_job_storage(connection: Connection, job_id: int):
+    """Delete every row of a job, keeping its table / partition."""
+    if PER_JOB_TABLES:
+        connection.execute(csv_data_table(job_id).delete())
+        return
+    name = None
+    if RANGE_PARTITIONED and CSV_DATA_PARTITION_JOBS == 1:
+        name = _own_partition(connection, job_id)
+    if name:
+        connection.exec_driver_sql(f"ALTER TABLE csv_data TRUNCATE PARTITION {name}")
+    else:
+        connection.execute(
+            CSVData.__table__.delete().where(CSVData.job_id == job_id)
+        )
+
 
-    upload_csv = relationship("UploadCSV", back_populates="csv_data")
+def drop_job_storage(connection: Connection, job_id: int):
+    """
+    Remove a job's rows for good.
+    -> per-job table / one-job partition: DROP, O(1) in the row count
+    -> shared table or multi-job partition: DELETE of that job's rows
+    """
+    if PER_JOB_TABLES:
+        csv_data_table(job_id).drop(connection, checkfirst=True)
+        return
+    name = None
+    if RANGE_PARTITIONED and CSV_DATA_PARTITION_JOBS == 1:
+        name = _own_partition(connection, job_id)
+    if name:
+        connection.exec_driver_sql(f"ALTER TABLE csv_data DROP PARTITION {name}")
+    else:
+        clear_job_storage(connection, job_id)
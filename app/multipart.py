@@ -0,0 +1,220 @@
+"""
+This module reads multipart/form-data request bodies incrementally.
+
+FastAPI's File()/Form() parameters spool the whole body to a temporary
+file before the handler runs, so size limits and capacity checks only
+apply once everything has been received. MultipartStream instead hands
+the handler one part at a time, straight from request.stream().
+"""
+
+from collections import deque
+from typing import NamedTuple, Optional, Type
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+
+# Boundaries, part headers and small fields around the file(s)
+FORM_OVERHEAD_BYTES = 64 * 1024
+# Non-file fields are short options (ids, flags)
+MAX_FIELD_BYTES = 1024
+
+
+class FormPart(NamedTuple):
+    name: str
+    # None for plain fields
+    filename: Optional[str]
+
+
+class MultipartStream:
+    """
+    Parts of a multipart/form-data body, parsed as it arrives.
+
+    -> 413 on a Content-Length above max_size, before the body is read
+    -> 413 once more than max_size bytes arrived (chunked bodies)
+    -> 400 on a malformed or truncated body
+    -> Memory bounded by one network chunk
+
+        while part := await form.next_part():
+            data = await form.read(size)  # b"" at the end of the part
+    """
+
+    def __init__(self, request: Request, max_size: int):
+        content_type, params = parse_options_header(
+            request.headers.get("content-type", "")
+        )
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(400, "Expected a multipart/form-data body")
+        length = request.headers.get("content-length", "")
+        if length.isdigit() and int(length) > max_size:
+            raise HTTPException(
+                413,
+                f"Request body too large. Maximum allowed size is {max_size} bytes",
+            )
+        self.max_size = max_size
+        self.received = 0
+        self._chunks = request.stream()
+        self._events = deque()
+        self._header_name = self._header_value = b""
+        self._disposition = b""
+        self._in_part = False
+        self._finished = False
+        self._parser = MultipartParser(
+            params[b"boundary"],
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_end": self._on_end,
+            },
+        )
+
+    # Parser callbacks: queue what the handler reads next
+    def _on_part_begin(self):
+        self._disposition = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if b"name" not in options:
+            raise HTTPException(400, "Form part without a name")
+        filename = options.get(b"filename")
+        self._events.append(
+            FormPart(
+                options[b"name"].decode("utf-8", "replace"),
+                None if filename is None else filename.decode("utf-8", "replace"),
+            )
+        )
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        self._events.append(data[start:end])
+
+    def _on_part_end(self):
+        self._events.append(None)
+
+    def _on_end(self):
+        self._finished = True
+
+    async def _pull(self) -> bool:
+        """Feed the next chunk to the parser; False at the end of the body."""
+        if self._finished:
+            return False
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            raise HTTPException(400, "Incomplete multipart body")
+        self.received += len(chunk)
+        if self.received > self.max_size:
+            raise HTTPException(
+                413,
+                f"Request body too large. Maximum allowed size is "
+                f"{self.max_size} bytes",
+            )
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError as e:
+            raise HTTPException(400, f"Malformed multipart body: {e}")
+        return True
+
+    async def next_part(self) -> Optional[FormPart]:
+        """The next part's name and filename (unread data is skipped)."""
+        while self._in_part:
+            await self.read()
+        while True:
+            while self._events:
+                event = self._events.popleft()
+                if isinstance(event, FormPart):
+                    self._in_part = True
+                    return event
+            if not await self._pull():
+                return None
+
+    async def read(self, size: int = -1) -> bytes:
+        """Up to `size` bytes of the current part; b"" at its end."""
+        while self._in_part:
+            while not self._events:
+                if not await self._pull():
+                    raise HTTPException(400, "Incomplete multipart body")
+            data = self._events.popleft()
+            if data is None:
+                self._in_part = False
+                break
+            if not data:
+                continue
+            if 0 <= size < len(data):
+                self._events.appendleft(data[size:])
+                data = data[:size]
+            return data
+        return b""
+
+    async def read_field(self) -> str:
+        """The current part as text, up to MAX_FIELD_BYTES."""
+        value = b""
+        while chunk := await self.read():
+            value += chunk
+            if len(value) > MAX_FIELD_BYTES:
+                raise HTTPException(400, "Form field too long")
+        try:
+            return value.decode("utf-8")
+        except UnicodeDecodeError:
+            raise HTTPException(400, "Form fields must be UTF-8")
+
+
+def parse_form(model: Type[BaseModel], fields: dict) -> BaseModel:
+    """
+    Validate plain form fields the way Form() parameters are: 422 on bad
+    values, blank fields count as unset.
+    """
+    try:
+        return model.model_validate(
+            {name: value for name, value in fields.items() if value != ""}
+        )
+    except ValidationError as e:
+        raise RequestValidationError(
+            [
+                {**error, "loc": ("body", *error["loc"])}
+                for error in e.errors(include_url=False)
+            ]
+        )
+
+
+def missing_form_file(name: str) -> RequestValidationError:
+    return RequestValidationError(
+        [{"type": "missing", "loc": ("body", name), "msg": "Field required", "input": None}]
+    )
+
+
+def form_openapi(model: Type[BaseModel], file_field: str, many: bool = False) -> dict:
+    """
+    requestBody docs for a handler that parses its own form: the model's
+    fields plus the (required) file field.
+    """
+    schema = model.model_json_schema()
+    binary = {"type": "string", "format": "binary"}
+    schema["properties"][file_field] = (
+        {"type": "array", "items": binary} if many else binary
+    )
+    schema["required"] = [file_field]
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"multipart/form-data": {"schema": schema}},
+        }
+    }
@@ -0,0 +1,141 @@
+"""
+This module converts MySQL's csv_data table to and from RANGE
+partitioning on job_id (CSV_DATA_STORAGE=partitioned, see app.models).
+
+    python -m app.partitioning enable|disable|maintain
+
+An explicit step rather than a migration: the schema alembic builds must
+not depend on the environment it runs in. SQLite partitioned storage
+uses per-job tables created at runtime and needs no conversion.
+
+`maintain` creates job id ranges ahead of new jobs and drops the ones
+retention emptied (see app.models.maintain_partitions); Celery beat runs
+it every PARTITION_MAINTENANCE_INTERVAL_SECONDS, cron can run it instead.
+Uploads never run partition DDL themselves.
+"""
+
+import argparse
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from .config import CSV_DATA_STORAGE
+from .database import sync_engine
+from .models import drop_unused_partitions, extend_partitions
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_partitioned(connection: Connection) -> bool:
+    return bool(
+        connection.execute(
+            text(
+                "SELECT COUNT(*) FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'csv_data' "
+                "AND PARTITION_NAME IS NOT NULL"
+            )
+        ).scalar()
+    )
+
+
+def _foreign_key_name(connection: Connection):
+    for fk in inspect(connection).get_foreign_keys("csv_data"):
+        if fk["referred_table"] == "upload_jobs":
+            return fk["name"]
+    return None
+
+
+def partition_csv_data(connection: Connection) -> bool:
+    """
+    RANGE-partition csv_data on job_id; False if it already is.
+    The partition key must be part of the primary key, and partitioned
+    tables cannot have foreign keys.
+    """
+    if is_partitioned(connection):
+        return False
+    fk_name = _foreign_key_name(connection)
+    if fk_name:
+        connection.exec_driver_sql(f"ALTER TABLE csv_data DROP FOREIGN KEY {fk_name}")
+    connection.exec_driver_sql(
+        "ALTER TABLE csv_data "
+        "MODIFY job_id INTEGER NOT NULL, "
+        "DROP PRIMARY KEY, ADD PRIMARY KEY (id, job_id)"
+    )
+    # Existing jobs share one partition; new jobs get their own ranges
+    max_job_id = connection.execute(
+        text("SELECT COALESCE(MAX(job_id), 0) FROM csv_data")
+    ).scalar()
+    partitions = "PARTITION pmax VALUES LESS THAN MAXVALUE"
+    if max_job_id:
+        partitions = f"PARTITION p0 VALUES LESS THAN ({max_job_id + 1}), " + partitions
+    connection.exec_driver_sql(
+        f"ALTER TABLE csv_data PARTITION BY RANGE (job_id) ({partitions})"
+    )
+    return True
+
+
+def unpartition_csv_data(connection: Connection) -> bool:
+    """Back to one csv_data table keyed on id; False if not partitioned."""
+    if not is_partitioned(connection):
+        return False
+    connection.exec_driver_sql("ALTER TABLE csv_data REMOVE PARTITIONING")
+    connection.exec_driver_sql(
+        "ALTER TABLE csv_data "
+        "DROP PRIMARY KEY, ADD PRIMARY KEY (id), "
+        "MODIFY job_id INTEGER NULL"
+    )
+    connection.exec_driver_sql(
+        "ALTER TABLE csv_data "
+        "ADD FOREIGN KEY (job_id) REFERENCES upload_jobs (id)"
+    )
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "action",
+        choices=("enable", "disable", "maintain"),
+        help="partition csv_data, merge it back into one table, or add/drop ranges",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if sync_engine.dialect.name != "mysql":
+        raise SystemExit(
+            f"csv_data is only range-partitioned on MySQL, not "
+            f"{sync_engine.dialect.name}"
+        )
+    if args.action == "maintain":
+        with sync_engine.begin() as connection:
+            if not is_partitioned(connection):
+                raise SystemExit("csv_data is not partitioned; run `enable` first")
+            added = extend_partitions(connection)
+            dropped = drop_unused_partitions(connection)
+        logger.info(f"[PARTITIONING] added {added} ranges, dropped {dropped}")
+        return
+
+    with sync_engine.begin() as connection:
+        if args.action == "enable":
+            changed = partition_csv_data(connection)
+            # Ranges for the next jobs, so they do not all land in pmax
+            extend_partitions(connection)
+        else:
+            changed = unpartition_csv_data(connection)
+    logger.info(
+        f"[PARTITIONING] csv_data {args.action}d"
+        if changed
+        else f"[PARTITIONING] csv_data already {args.action}d, nothing to do"
+    )
+    wanted = args.action == "enable"
+    if wanted != (CSV_DATA_STORAGE == "partitioned"):
+        logger.warning(
+            f"[PARTITIONING] CSV_DATA_STORAGE is {CSV_DATA_STORAGE!r}; set it to "
+            f"{'partitioned' if wanted else 'shared'} on the API and workers"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+This module contains opt-in profiling of import jobs.
+
+A job is profiled when its upload asked for it (admins only, see
+POST /upload) or when the worker runs with PROFILE_IMPORTS set. The
+output is stored per job under PROFILE_DIR and served by
+GET /jobs/{job_id}/profile:
+-> cprofile: deterministic profile, pstats file (python -m pstats, snakeviz)
+-> sample: the task thread's stack every PROFILE_SAMPLE_INTERVAL seconds,
+   as collapsed stacks (flamegraph.pl, speedscope)
+
+Jobs without a mode run the task body directly; nothing is installed.
+"""
+
+import cProfile
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from decouple import config
+
+from .config import PROFILE_DIR
+
+
+logger = logging.getLogger(__name__)
+
+# Worker side: profile every import with this mode (cprofile | sample)
+PROFILE_IMPORTS = config("PROFILE_IMPORTS", default="")
+PROFILE_SAMPLE_INTERVAL = config("PROFILE_SAMPLE_INTERVAL", default=0.005, cast=float)
+
+# mode -> file suffix
+PROFILE_MODES = {"cprofile": ".pstats", "sample": ".collapsed"}
+
+
+def profile_path(job_id: int, mode: str) -> str:
+    return os.path.join(PROFILE_DIR, f"job-{job_id}{PROFILE_MODES[mode]}")
+
+
+def find_profile(job_id: int) -> Optional[Tuple[str, str]]:
+    """(mode, path) of the job's stored profile, or None."""
+    for mode in PROFILE_MODES:
+        path = profile_path(job_id, mode)
+        if os.path.exists(path):
+            return mode, path
+    return None
+
+
+def delete_profiles(job_id: int) -> Tuple[int, int]:
+    """Remove the job's profiles; returns (files, bytes) removed."""
+    files = size = 0
+    for mode in PROFILE_MODES:
+        path = profile_path(job_id, mode)
+        try:
+            stored = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            continue
+        files += 1
+        size += stored
+    return files, size
+
+
+class StackSampler:
+    """
+    Sample one thread's Python stack from a background thread and count
+    identical stacks. Costs one sys._current_frames() call per interval,
+    independent of how many calls the sampled thread makes.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            parent, name = os.path.split(code.co_filename)
+            filename = os.path.join(os.path.basename(parent), name)
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def write(self, fp):
+        """Collapsed format: one `root;...;leaf count` line per stack."""
+        for stack, count in self.counts.most_common():
+            fp.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profiled(job_id: int, mode: str):
+    """
+    Profile the block and store the result as the job's profile; a
+    failing block still writes it. Unknown modes run unprofiled.
+    """
+    if mode not in PROFILE_MODES:
+        logger.warning(f"[PROFILE] unknown mode {mode!r}, job {job_id} not profiled")
+        yield
+        return
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = profile_path(job_id, mode)
+    # Readers never see a half-written file; a retry replaces the profile
+    partial = f"{path}.part"
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(partial)
+            os.replace(partial, path)
+    else:
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            with open(partial, "w", encoding="utf-8") as fp:
+                sampler.write(fp)
+            os.replace(partial, path)
+    logger.info(f"[PROFILE] job_id={job_id} {mode} profile stored at {path}")
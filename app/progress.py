@@ -0,0 +1,86 @@
+"""
+This module contains worker-side progress reporting for import jobs
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Union
+
+from decouple import config
+
+from .events import publish_job_event
+from .models import UploadCSV
+from .utils import CSVReader, ParallelCSVReader
+
+
+# Minimum seconds between two progress writes for the same job
+PROGRESS_INTERVAL_SECONDS = config("PROGRESS_INTERVAL_SECONDS", default=1.0, cast=float)
+
+
+class ProgressTracker:
+    """
+    Record rows processed, bytes consumed and throughput on an UploadCSV.
+
+    Updates only touch the ORM object; they are persisted by the next
+    commit (the bulk inserter commits once per batch), and are throttled
+    to one every PROGRESS_INTERVAL_SECONDS. publish() then pushes them
+    to job event subscribers.
+
+    Every update, throttled or not, also stores the stream's latest
+    record boundary at or before rows_processed as the job's checkpoint,
+    so a retry resumes there instead of at the top of the file.
+    """
+
+    def __init__(
+        self,
+        job: UploadCSV,
+        stream: Union[CSVReader, ParallelCSVReader],
+        interval: float = PROGRESS_INTERVAL_SECONDS,
+    ):
+        self.job = job
+        self.stream = stream
+        self.interval = interval
+        self._started = time.monotonic()
+        self._last_update = float("-inf")
+        self._unpublished = False
+        self._resumed_rows = 0
+
+    def start(self, resumed_rows: int = 0):
+        """resumed_rows: rows already committed by an earlier attempt."""
+        self._started = time.monotonic()
+        self._resumed_rows = resumed_rows
+        if not resumed_rows:
+            self.job.started_at = datetime.now(timezone.utc)
+        self.job.finished_at = None
+        self.job.rows_processed = resumed_rows
+        self.job.bytes_processed = self.stream.start_offset or 0
+        self.job.rows_per_sec = None
+
+    def update(self, rows_processed: int, force: bool = False):
+        # The checkpoint is not throttled: it rides on every batch commit
+        row, offset = self.stream.boundaries.latest(rows_processed)
+        self.job.checkpoint_row = row
+        self.job.checkpoint_offset = offset
+
+        now = time.monotonic()
+        if not force and now - self._last_update < self.interval:
+            return
+        self._last_update = now
+
+        elapsed = max(now - self._started, 1e-6)
+        self.job.rows_processed = rows_processed
+        self.job.bytes_processed = self.stream.bytes_read
+        self.job.rows_per_sec = round(
+            (rows_processed - self._resumed_rows) / elapsed, 2
+        )
+        self._unpublished = True
+
+    def publish(self):
+        """Push the last update to subscribers; call after it is committed."""
+        if self._unpublished:
+            self._unpublished = False
+            publish_job_event(self.job)
+
+    def finish(self, rows_processed: int):
+        self.update(rows_processed, force=True)
+        self.job.finished_at = datetime.now(timezone.utc)
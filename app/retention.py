@@ -0,0 +1,282 @@
+"""
+This module purges expired import jobs, expired resumable upload
+sessions and orphaned upload files.
+
+    python -m app.retention [--days 30] [--dry-run]
+
+Also scheduled through Celery beat (see app.celery).
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from decouple import config
+from sqlalchemy import select, delete, exists
+from sqlalchemy.orm import Session
+
+from .config import UPLOAD_DIR
+from .database import SyncSessionLocal
+from .models import (
+    UploadCSV,
+    UploadBatch,
+    UploadSession,
+    CSVData,
+    CSVReject,
+    UNFINISHED_STATUSES,
+    PARTITIONED,
+    drop_job_storage,
+)
+from .profiling import delete_profiles
+from .utils import delete_file_safe
+
+
+logger = logging.getLogger(__name__)
+
+# Jobs finished longer ago than this are purged
+JOB_RETENTION_DAYS = config("JOB_RETENTION_DAYS", default=30, cast=float)
+# CSVData rows removed per DELETE (one short transaction each)
+PURGE_BATCH_SIZE = config("PURGE_BATCH_SIZE", default=10000, cast=int)
+# Upper bound on jobs purged per run, so one run cannot take unbounded time
+PURGE_MAX_JOBS = config("PURGE_MAX_JOBS", default=1000, cast=int)
+# Unreferenced upload files younger than this may still be in flight
+ORPHAN_FILE_MIN_AGE_SECONDS = config(
+    "ORPHAN_FILE_MIN_AGE_SECONDS", default=3600, cast=int
+)
+
+
+
+@dataclass
+class PurgeReport:
+    jobs: int = 0
+    rows: int = 0
+    files: int = 0
+    bytes: int = 0
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def delete_in_batches(session: Session, model, job_id: int, batch_size: int) -> int:
+    """
+    Delete a job's rows of `model` in id-ordered batches, committing
+    after each, so no single statement holds locks for the whole job.
+    """
+    deleted = 0
+    while True:
+        # Upper id of the next batch, found on the (job_id, id) index
+        upper = session.scalar(
+            select(model.id)
+            .where(model.job_id == job_id)
+            .order_by(model.id)
+            .offset(batch_size - 1)
+            .limit(1)
+        )
+        query = delete(model).where(model.job_id == job_id)
+        if upper is not None:
+            query = query.where(model.id <= upper)
+        result = session.execute(query)
+        session.commit()
+        deleted += result.rowcount
+        if upper is None:
+            return deleted
+
+
+def delete_job_rows(session: Session, job: UploadCSV, batch_size: int) -> int:
+    """
+    Delete a job's CSVData rows and rejects in batches.
+    Partitioned storage drops the job's table/partition instead.
+    """
+    deleted = delete_in_batches(session, CSVReject, job.id, batch_size)
+    if PARTITIONED:
+        drop_job_storage(session.connection(), job.id)
+        session.commit()
+        stored = (job.rows_processed or 0) - (job.rows_rejected or 0)
+        return deleted + max(stored, 0)
+    return deleted + delete_in_batches(session, CSVData, job.id, batch_size)
+
+
+def purge_expired_jobs(
+    session: Session,
+    older_than: timedelta,
+    batch_size: int = PURGE_BATCH_SIZE,
+    max_jobs: int = PURGE_MAX_JOBS,
+    dry_run: bool = False,
+) -> PurgeReport:
+    """
+    Remove finished jobs created before now - older_than, with their
+    rows, upload files and profiles. Unfinished jobs are never touched.
+    """
+    report = PurgeReport()
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - older_than
+    jobs = session.scalars(
+        select(UploadCSV)
+        .where(
+            UploadCSV.created_at < cutoff,
+            UploadCSV.status.not_in(UNFINISHED_STATUSES),
+        )
+        .order_by(UploadCSV.id)
+        .limit(max_jobs)
+    ).all()
+
+    for job in jobs:
+        report.jobs += 1
+        # Successful imports already removed their file
+        has_file = os.path.exists(job.file_path)
+        if has_file:
+            report.files += 1
+            report.bytes += _file_size(job.file_path)
+        if dry_run:
+            report.rows += job.rows_processed or 0
+            continue
+
+        report.rows += delete_job_rows(session, job, batch_size)
+        if has_file:
+            delete_file_safe(job.file_path)
+        files, size = delete_profiles(job.id)
+        report.files += files
+        report.bytes += size
+        session.execute(delete(UploadSession).where(UploadSession.job_id == job.id))
+        session.execute(delete(UploadCSV).where(UploadCSV.id == job.id))
+        session.commit()
+        logger.info(f"[RETENTION] purged job {job.id}")
+
+    if not dry_run:
+        # Batches whose jobs are all gone
+        session.execute(
+            delete(UploadBatch).where(
+                UploadBatch.created_at < cutoff,
+                ~exists().where(UploadCSV.batch_id == UploadBatch.id),
+            )
+        )
+        session.commit()
+    return report
+
+
+def purge_expired_sessions(session: Session, dry_run: bool = False) -> PurgeReport:
+    """
+    Remove resumable upload sessions past expires_at, with the partial
+    file of those never finalized (a finalized one's file is its job's)
+    and any leftover PATCH part files.
+    """
+    report = PurgeReport()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    uploads = session.scalars(
+        select(UploadSession).where(UploadSession.expires_at < now)
+    ).all()
+    for upload in uploads:
+        # Part files are left behind by PATCH requests that died
+        paths = glob.glob(f"{glob.escape(upload.file_path)}.*.part")
+        if upload.job_id is None and os.path.exists(upload.file_path):
+            paths.append(upload.file_path)
+        for path in paths:
+            report.files += 1
+            report.bytes += _file_size(path)
+            if not dry_run:
+                delete_file_safe(path)
+    if uploads and not dry_run:
+        session.execute(
+            delete(UploadSession).where(
+                UploadSession.id.in_([upload.id for upload in uploads])
+            )
+        )
+        session.commit()
+    return report
+
+
+def sweep_orphan_files(
+    session: Session,
+    upload_dir: str = UPLOAD_DIR,
+    min_age: float = ORPHAN_FILE_MIN_AGE_SECONDS,
+    dry_run: bool = False,
+) -> PurgeReport:
+    """
+    Delete files in upload_dir that no job references: leftovers of
+    uploads that never became a job. A job's file, even a failed one's
+    (a retry may still read it), goes with the job in purge_expired_jobs.
+    Files newer than min_age are kept (an upload may still be writing).
+    """
+    report = PurgeReport()
+    if not os.path.isdir(upload_dir):
+        return report
+
+    in_use = set(
+        os.path.abspath(path) for path in session.scalars(select(UploadCSV.file_path))
+    )
+    now = time.time()
+    with os.scandir(upload_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or os.path.abspath(entry.path) in in_use:
+                continue
+            stat = entry.stat()
+            if now - stat.st_mtime < min_age:
+                continue
+            report.files += 1
+            report.bytes += stat.st_size
+            if not dry_run:
+                delete_file_safe(entry.path)
+
+    return report
+
+
+def run_retention(
+    days: Optional[float] = None, dry_run: bool = False
+) -> PurgeReport:
+    """
+    Purge expired upload sessions and jobs, then sweep orphaned files;
+    returns the totals.
+    """
+    days = JOB_RETENTION_DAYS if days is None else days
+    session = SyncSessionLocal()
+    try:
+        sessions = purge_expired_sessions(session, dry_run=dry_run)
+        purged = purge_expired_jobs(
+            session, timedelta(days=days), dry_run=dry_run
+        )
+        swept = sweep_orphan_files(session, dry_run=dry_run)
+    finally:
+        session.close()
+
+    report = PurgeReport(
+        jobs=purged.jobs,
+        rows=purged.rows,
+        files=sessions.files + purged.files + swept.files,
+        bytes=sessions.bytes + purged.bytes + swept.bytes,
+    )
+    logger.info(
+        f"[RETENTION] jobs={report.jobs} rows={report.rows} "
+        f"files={report.files} bytes={report.bytes} dry_run={dry_run}"
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--days",
+        type=float,
+        default=JOB_RETENTION_DAYS,
+        help="purge jobs created more than this many days ago",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only report what would be removed"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = run_retention(days=args.days, dry_run=args.dry_run)
+    print(json.dumps(asdict(report)))
+
+
+if __name__ == "__main__":
+    main()
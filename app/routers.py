@@ -1,10 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timezone
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.database import get_db
-from app.models import User
-from app.schemas import UserCreate, UserLogin, Token, UserResponse
-from app.security import get_hashed_password, verify_password, create_access_token
+from app.models import (
+    User,
+    ImportSchema,
+    UploadCSV,
+    UploadSession,
+    UNFINISHED_STATUSES,
+)
+from app.schemas import (
+    UserCreate,
+    UserLogin,
+    Token,
+    UserResponse,
+    UserSnapshot,
+    ImportSchemaCreate,
+    ImportSchemaOut,
+)
+from app.mapping import RowConverter
+from app.security import (
+    get_hashed_password_async,
+    verify_password_async,
+    create_access_token,
+)
 from .auth import get_current_active_user
 
 
@@ -20,11 +41,13 @@ async def register_user(data: UserCreate, db: AsyncSession = Depends(get_db)):
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
+    hashed_password = await get_hashed_password_async(data.password)
+
     try:
         new_user = User(
             username=data.username,
             email=data.email,
-            hashed_password=get_hashed_password(data.password),
+            hashed_password=hashed_password,
         )
         db.add(new_user)
         await db.commit()
@@ -45,15 +68,25 @@ async def login(data: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == data.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(data.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_password_async(
+            data.password, user.hashed_password
+        )
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # bcrypt cost changed since this hash was made: store an upgraded one
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
     token = create_access_token({"sub": user.email})
     return Token(access_token=token, token_type="Bearer")
 
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_active_user)):
+async def logout(current_user: UserSnapshot = Depends(get_current_active_user)):
     """
     JWT Logout is stateless.
     The client must remove the token from LocalStorage/Cookies.
@@ -63,5 +96,142 @@ async def logout(current_user: User = Depends(get_current_active_user)):
 
 # (Optional) Endpoint to get current user details
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
+async def read_users_me(current_user: UserSnapshot = Depends(get_current_active_user)):
     return current_user
+
+
+schema_router = APIRouter(prefix="/schemas", tags=["Import schemas"])
+
+
+def compile_or_400(data: ImportSchemaCreate) -> list:
+    """Columns as stored; compiling them once surfaces bad defaults early."""
+    columns = [column.model_dump() for column in data.columns]
+    try:
+        RowConverter(columns)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return columns
+
+
+async def get_schema_or_404(
+    db: AsyncSession, schema_id: int, user_id: int
+) -> ImportSchema:
+    schema = await db.get(ImportSchema, schema_id)
+    if not schema or schema.user_id != user_id:
+        raise HTTPException(404, "Import schema not found")
+    return schema
+
+
+async def ensure_name_free(db: AsyncSession, user_id: int, name: str, schema_id=None):
+    existing = await db.scalar(
+        select(ImportSchema.id).where(
+            ImportSchema.user_id == user_id, ImportSchema.name == name
+        )
+    )
+    if existing is not None and existing != schema_id:
+        raise HTTPException(400, "An import schema with this name already exists")
+
+
+@schema_router.post("", response_model=ImportSchemaOut, status_code=201)
+async def create_schema(
+    data: ImportSchemaCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    columns = compile_or_400(data)
+    await ensure_name_free(db, current_user.id, data.name)
+    schema = ImportSchema(user_id=current_user.id, name=data.name, columns=columns)
+    db.add(schema)
+    await db.commit()
+    await db.refresh(schema)
+    return schema
+
+
+@schema_router.get("", response_model=List[ImportSchemaOut])
+async def list_schemas(
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    result = await db.scalars(
+        select(ImportSchema)
+        .where(ImportSchema.user_id == current_user.id)
+        .order_by(ImportSchema.id)
+    )
+    return result.all()
+
+
+@schema_router.get("/{schema_id}", response_model=ImportSchemaOut)
+async def get_schema(
+    schema_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    return await get_schema_or_404(db, schema_id, current_user.id)
+
+
+@schema_router.put("/{schema_id}", response_model=ImportSchemaOut)
+async def update_schema(
+    schema_id: int,
+    data: ImportSchemaCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    """
+    Replace the mapping and bump the version. Jobs uploaded against the
+    previous version and not yet started fail instead of mixing layouts.
+    """
+    schema = await get_schema_or_404(db, schema_id, current_user.id)
+    columns = compile_or_400(data)
+    await ensure_name_free(db, current_user.id, data.name, schema_id)
+    schema.name = data.name
+    schema.columns = columns
+    schema.version += 1
+    await db.commit()
+    await db.refresh(schema)
+    return schema
+
+
+@schema_router.delete("/{schema_id}", status_code=204)
+async def delete_schema(
+    schema_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_active_user),
+):
+    schema = await get_schema_or_404(db, schema_id, current_user.id)
+    in_use = await db.scalar(
+        select(UploadCSV.id)
+        .where(
+            UploadCSV.schema_id == schema_id,
+            UploadCSV.status.in_(UNFINISHED_STATUSES),
+        )
+        .limit(1)
+    )
+    if in_use is not None:
+        raise HTTPException(409, "Import schema is used by a pending import")
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    in_use = await db.scalar(
+        select(UploadSession.id)
+        .where(
+            UploadSession.schema_id == schema_id,
+            UploadSession.job_id.is_(None),
+            UploadSession.expires_at >= now,
+        )
+        .limit(1)
+    )
+    if in_use is not None:
+        raise HTTPException(409, "Import schema is used by a resumable upload")
+    # Finished jobs keep schema_version but no longer point at the schema,
+    # nor do finalized or expired upload sessions
+    await db.execute(
+        update(UploadCSV)
+        .where(UploadCSV.schema_id == schema_id)
+        .values(schema_id=None)
+    )
+    await db.execute(
+        update(UploadSession)
+        .where(UploadSession.schema_id == schema_id)
+        .values(schema_id=None)
+    )
+    await db.delete(schema)
+    await db.commit()
+    return Response(status_code=204)
@@ -1,14 +1,19 @@
 from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, field_validator
+from typing import Any, Dict, Literal, Optional, List
+from pydantic import BaseModel, Field, computed_field, field_validator
 from .models import JobStatus
 
 
+# Row columns that can be requested from GET /jobs/{job_id}/rows
+CSV_ROW_FIELDS = ("name", "role", "loc", "extra", "extras")
+
+
 class CSVDataBase(BaseModel):
-    name: Optional[str] = None
-    role: Optional[str] = None
-    loc: Optional[str] = None
-    extra: Optional[str] = None
+    # max_length mirrors the String(100) columns of CSVData
+    name: Optional[str] = Field(None, max_length=100)
+    role: Optional[str] = Field(None, max_length=100)
+    loc: Optional[str] = Field(None, max_length=100)
+    extra: Optional[str] = Field(None, max_length=100)
 
 
 class CSVDataCreate(CSVDataBase):
@@ -45,15 +50,185 @@ class UploadCSVOut(UploadCSVBase):
     file_path: str
     created_at: datetime
     updated_at: datetime
-    csv_data: List[CSVDataOut] = []  # Nested rows
+    file_size: Optional[int] = None
+    total_rows: Optional[int] = None
+    schema_id: Optional[int] = None
+    schema_version: Optional[int] = None
+    rows_processed: int = 0
+    rows_rejected: int = 0
+    bytes_processed: int = 0
+    rows_per_sec: Optional[float] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
     model_config = {"from_attributes": True}
 
+    @computed_field
+    @property
+    def percent_complete(self) -> Optional[float]:
+        """Share of the file consumed, measured in bytes."""
+        if self.status in (JobStatus.SUCCESS, JobStatus.PARTIAL):
+            return 100.0
+        if not self.file_size:
+            return None
+        return round(min(self.bytes_processed / self.file_size, 1.0) * 100, 2)
+
+    @computed_field
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time extrapolated from measured rows/sec."""
+        if self.status != JobStatus.PROCESSING or not self.rows_per_sec:
+            return None
+        if not self.bytes_processed or not self.file_size:
+            return None
+        # Estimate remaining rows from the byte ratio; the upload-time
+        # row count is line based and over-counts multi-line fields.
+        fraction = min(self.bytes_processed / self.file_size, 1.0)
+        remaining_rows = self.rows_processed * (1 - fraction) / fraction
+        return round(remaining_rows / self.rows_per_sec, 1)
+
+
+class CSVRowPage(BaseModel):
+    """One keyset page of processed rows"""
+
+    job_id: int
+    rows: List[Dict[str, Any]]
+    next_cursor: Optional[int] = None  # pass as after_id for the next page
+
+
+class CSVRejectOut(BaseModel):
+    """A rejected row and why"""
+
+    id: int
+    row_number: Optional[int] = None
+    reason: str
+    data: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+
+class CSVRejectPage(BaseModel):
+    """One keyset page of rejected rows"""
+
+    job_id: int
+    rejects: List[CSVRejectOut]
+    next_cursor: Optional[int] = None  # pass as after_id for the next page
+
+
+class ImportColumn(BaseModel):
+    """One CSV header mapped onto a CSVData column or an extras key"""
+
+    source: str = Field(..., min_length=1, max_length=100)  # CSV header
+    target: str = Field(..., min_length=1, max_length=100)
+    type: Literal["string", "integer", "float", "boolean", "date", "datetime"] = (
+        "string"
+    )
+    default: Optional[str] = None  # for empty values; converted like them
+    required: bool = False
+
+
+class ImportSchemaCreate(BaseModel):
+    """
+    Targets name, role, loc and extra fill those columns; any other
+    target is stored under that key in the row's `extras` object.
+    """
+
+    name: str = Field(..., min_length=1, max_length=100)
+    columns: List[ImportColumn] = Field(..., min_length=1)
+
+    @field_validator("columns")
+    @classmethod
+    def validate_targets(cls, value):
+        targets = [column.target for column in value]
+        duplicates = sorted({t for t in targets if targets.count(t) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate targets: {', '.join(duplicates)}")
+        return value
+
+
+class ImportSchemaOut(ImportSchemaCreate):
+    """Stored import schema; version increases on every update"""
+
+    id: int
+    version: int
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class UploadForm(BaseModel):
+    """Form fields sent alongside the file to POST /upload."""
+
+    schema_id: Optional[int] = None
+    # Admins: record a profile of the import
+    profile: Optional[Literal["cprofile", "sample"]] = None
+
+
+class BatchUploadForm(BaseModel):
+    """Form fields sent alongside the files to POST /upload/batch."""
+
+    schema_id: Optional[int] = None
+
 
 class UploadResponse(BaseModel):
     job_id: int
     status: JobStatus
     message: str
+    deduplicated: bool = False  # True when an earlier identical job was reused
+
+
+class UploadSessionCreate(BaseModel):
+    """Start a resumable upload of `size` bytes"""
+
+    filename: str = Field(..., min_length=1, max_length=100)
+    size: int = Field(..., ge=1)
+    schema_id: Optional[int] = None
+
+
+class UploadSessionOut(BaseModel):
+    """Resumable upload; send the next PATCH at `offset`"""
+
+    id: str
+    filename: str
+    size: int
+    offset: int
+    schema_id: Optional[int] = None
+    job_id: Optional[int] = None  # set once finalized
+    created_at: datetime
+    expires_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class BatchUploadJob(BaseModel):
+    job_id: int
+    filename: str
+    status: JobStatus
+
+
+class BatchUploadResponse(BaseModel):
+    batch_id: int
+    jobs: List[BatchUploadJob]
+    message: str
+
+
+class UploadBatchOut(BaseModel):
+    """
+    Batch status aggregated from its jobs:
+    -> PENDING / PROCESSING while any job is unfinished (or RETRYING)
+    -> SUCCESS or FAILED when every job ended that way, else PARTIAL
+    """
+
+    id: int
+    status: JobStatus
+    created_at: datetime
+    total_jobs: int
+    counts: Dict[JobStatus, int]  # jobs per status
+    total_rows: Optional[int] = None  # None while a job's row count is unknown
+    rows_processed: int = 0
+    rows_rejected: int = 0
+    jobs: List[UploadCSVOut]
 
 
 class UserBase(BaseModel):
@@ -111,6 +286,21 @@ class UserResponse(UserBase):
     model_config = {"from_attributes": True}
 
 
+class UserSnapshot(BaseModel):
+    """
+    Immutable copy of the authenticated user, safe to cache across
+    requests (no session or lazy-loading attached).
+    """
+
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    created_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True, "frozen": True}
+
+
 class UserLogin(BaseModel):
     """
     Schema for user login.
@@ -136,3 +326,4 @@ class TokenData(BaseModel):
 
     email: str | None = None
     username: str | None = None
+    exp: int | None = None  # expiry, seconds since epoch
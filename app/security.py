@@ -2,20 +2,41 @@
 This module contains security settings
 """
 
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 import jwt
 from decouple import config
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
-from typing import Optional
+from typing import Optional, Tuple
 from app.schemas import TokenData
+from app.metrics import PASSWORD_HASH_SECONDS, PASSWORD_HASH_PENDING
 
 
 TOKEN_LIFE_MINUIT = int(config("ACCESS_TOKEN_LIFE_MINUIT"))
 SECRET_KEY = config("SECRET_KEY")
 ENCODE_ALGORITHM = config("ENCODE_ALGORITHM")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost; hashes made with any other cost are upgraded on next login
+BCRYPT_ROUNDS = config("BCRYPT_ROUNDS", default=12, cast=int)
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=2, cast=int)
+PASSWORD_HASH_MAX_PENDING = config("PASSWORD_HASH_MAX_PENDING", default=32, cast=int)
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a small thread pool keeps it off the event loop
+_hash_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+)
+_hash_pending = 0
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -41,6 +62,51 @@ def get_hashed_password(password: str) -> str:
         )
 
 
+async def _run_hashing(operation: str, func, *args):
+    """
+    Run a bcrypt call on the hashing executor.
+    Rejects with 503 once PASSWORD_HASH_MAX_PENDING calls are waiting.
+    """
+    global _hash_pending
+    if _hash_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent authentication requests. Retry later.",
+            headers={"Retry-After": "1"},
+        )
+
+    _hash_pending += 1
+    PASSWORD_HASH_PENDING.set(_hash_pending)
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending -= 1
+        PASSWORD_HASH_PENDING.set(_hash_pending)
+        PASSWORD_HASH_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password off the event loop.
+    returns (valid, new_hash); new_hash is set when the stored hash uses
+    an outdated bcrypt cost and should be saved.
+    """
+    return await _run_hashing(
+        "verify", pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+
+async def get_hashed_password_async(password: str) -> str:
+    """
+    Hash a password off the event loop.
+    """
+    return await _run_hashing("hash", get_hashed_password, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a acceess token for user.
@@ -68,7 +134,7 @@ def verify_token(token: str) -> TokenData:
                 detail="Unverified token",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return TokenData(email=email)
+        return TokenData(email=email, exp=payload.get("exp"))
 
     except jwt.PyJWTError as e:
         # print(f"JWT Error: {e}")
@@ -1,11 +1,44 @@
+from dataclasses import asdict
+from typing import Optional
 from celery.utils.log import get_task_logger
+from sqlalchemy import select, func, delete
 from app.celery import celery
-from .database import SyncSessionLocal
-from .models import UploadCSV, CSVData, JobStatus
-from .utils import read_csv_as_dicts, delete_file_safe
+from .database import SyncSessionLocal, sync_engine
+from .models import (
+    UploadCSV,
+    CSVReject,
+    ImportSchema,
+    JobStatus,
+    csv_data_table,
+    ensure_job_storage,
+    maintain_partitions,
+)
+from .utils import CSVReader, ParallelCSVReader, delete_file_safe
+from .config import (
+    PARALLEL_PARSE_MIN_BYTES,
+    PARSE_CHUNK_BYTES,
+    PARSE_IN_FLIGHT_BYTES,
+    PARSE_WORKERS,
+)
+from .bulk import BulkInserter, INSERT_BATCH_SIZE
+from .progress import ProgressTracker
+from .validation import RowValidator, RejectWriter
+from .mapping import get_converter
+from .compression import compression_of
+from .events import publish_job_event
+from .retention import run_retention
+from .metrics import IMPORT_PARSE_SECONDS, IMPORT_ROWS_PER_SECOND
+from .profiling import PROFILE_IMPORTS, profiled
 
 logger = get_task_logger(__name__)
 
+# CSV header names read from each file, and the CSVData columns they
+# land in (job_id and row_number first)
+SOURCE_COLUMNS = ("name", "role", "location", "extra_info")
+CSV_DATA_COLUMNS = ("job_id", "row_number", "name", "role", "loc", "extra")
+# Columns written for jobs with an import schema (see app.mapping)
+SCHEMA_DATA_COLUMNS = CSV_DATA_COLUMNS + ("extras",)
+
 
 @celery.task(
     name="app.tasks.process_csv_task",
@@ -14,18 +47,33 @@ logger = get_task_logger(__name__)
     retry_backoff=True,
     max_retries=3,
 )
-def process_csv_task(self, job_id: int, file_path: str):
+def process_csv_task(self, job_id: int, file_path: str, profile: Optional[str] = None):
     """
     Synchronous Celery Task.
     No asyncio.run(), no await.
+
+    profile: cprofile | sample records a profile of the import (see
+    app.profiling); PROFILE_IMPORTS sets it for every job.
     """
-    logger.info(f"[TASK STARTED] job_id={job_id}")
+    mode = profile or PROFILE_IMPORTS
+    will_retry = self.request.retries < self.max_retries
+    if not mode:
+        return import_csv(job_id, file_path, will_retry)
+    with profiled(job_id, mode):
+        return import_csv(job_id, file_path, will_retry)
+
+
+def import_csv(job_id: int, file_path: str, will_retry: bool = False):
+    """
+    Import a stored upload into the job's rows.
 
-    # 1. CALCULATE DELAY LOGIC
-    delay_seconds = calculate_delay(file_path)
-    logger.info(f"[DELAY] Sleeping for {delay_seconds} seconds...")
+    Idempotent: rows carry their row_number, and a retry resumes at the
+    job's checkpoint, skipping rows an earlier attempt already committed.
+    will_retry: an error leaves the job RETRYING rather than FAILED.
+    """
+    logger.info(f"[TASK STARTED] job_id={job_id}")
 
-    # 2. PROCESS DATABASE (Synchronously)
+    # 1. PROCESS DATABASE (Synchronously)
     # We use a context manager to ensure the session closes
     session = SyncSessionLocal()
 
@@ -35,35 +83,135 @@ def process_csv_task(self, job_id: int, file_path: str):
         if not job:
             logger.error(f"Job {job_id} not found.")
             return
+        # Duplicate delivery of an already finished job
+        if job.status in (JobStatus.SUCCESS, JobStatus.PARTIAL):
+            logger.info(f"[TASK SKIPPED] job_id={job_id} already processed.")
+            return
+
+        # Column mapping: the job's import schema, as it was at upload
+        converter = None
+        if job.schema_id is not None:
+            schema = session.get(ImportSchema, job.schema_id)
+            if schema is None or schema.version != job.schema_version:
+                # Retrying cannot help; the file must be uploaded again
+                job.status = JobStatus.FAILED
+                job.error_message = (
+                    f"Import schema {job.schema_id} changed or was deleted "
+                    f"after upload (version {job.schema_version})"
+                )
+                session.commit()
+                publish_job_event(job)
+                logger.error(f"[TASK FAILED] job_id={job_id}: {job.error_message}")
+                return
+            converter = get_converter(schema)
+        if converter is None:
+            sources, columns = SOURCE_COLUMNS, CSV_DATA_COLUMNS
+        else:
+            sources, columns = converter.sources, SCHEMA_DATA_COLUMNS
+
+        # Resume after the rows earlier attempts committed (batches are
+        # committed in file order, so they are rows 1..committed)
+        ensure_job_storage(session.connection(), job_id)
+        table = csv_data_table(job_id)
+        committed = session.scalar(
+            select(func.max(table.c.row_number)).where(table.c.job_id == job_id)
+        ) or 0
+        start_offset, start_row = None, 0
+        if committed and job.checkpoint_offset:
+            start_offset, start_row = job.checkpoint_offset, job.checkpoint_row
+        if committed:
+            logger.info(
+                f"[TASK RESUMED] job_id={job_id} after row {committed} "
+                f"(parsing from row {start_row + 1}, byte {start_offset or 0})"
+            )
+
+        # Large files are parsed across a process pool; compressed ones
+        # cannot be split into byte ranges and are read sequentially
+        parallel = (
+            compression_of(file_path) is None
+            and job.file_size is not None
+            and job.file_size >= PARALLEL_PARSE_MIN_BYTES
+            and PARSE_WORKERS > 1
+        )
+        if parallel:
+            reader = ParallelCSVReader(
+                file_path,
+                sources,
+                chunk_bytes=PARSE_CHUNK_BYTES,
+                workers=PARSE_WORKERS,
+                max_in_flight_bytes=PARSE_IN_FLIGHT_BYTES,
+                start_offset=start_offset,
+                start_row=start_row,
+            )
+        else:
+            # Parsed batches the size of insert batches: a boundary at
+            # every commit keeps the checkpoint one batch behind at most
+            reader = CSVReader(
+                file_path,
+                sources,
+                batch_size=INSERT_BATCH_SIZE,
+                start_offset=start_offset,
+                start_row=start_row,
+            )
+        progress = ProgressTracker(job, reader)
 
         # Update Status to PROCESSING
         job.status = JobStatus.PROCESSING
+        job.error_message = None
+        progress.start(resumed_rows=committed)
+        # Rejects without a row number come from rows the parser dropped;
+        # it reports them again on this pass
+        session.execute(
+            delete(CSVReject).where(
+                CSVReject.job_id == job_id, CSVReject.row_number.is_(None)
+            )
+        )
         session.commit()
+        publish_job_event(job)
 
         # Insert CSV Data
-        # Re-open file to read data (since we might have read it for counting)
-        bulk_data = []
-        for row in read_csv_as_dicts(file_path, delay=delay_seconds):
-            csv_obj = CSVData(
-                job_id=job_id,
-                name=row.get("name"),
-                role=row.get("role"),
-                loc=row.get("location"),
-                extra=row.get("extra_info"),
-            )
-            bulk_data.append(csv_obj)
-
-        # Bulk save is faster
-        session.add_all(bulk_data)
-        session.commit()
+        # Rows are validated per batch and streamed into batched Core INSERTs
+        rows = (
+            (row_number, record)
+            for row_number, record in enumerate(reader, start=start_row + 1)
+            if row_number > committed
+        )
+        validator = RowValidator(
+            job_id,
+            columns[2:],
+            sink=RejectWriter(session, job_id),
+            table=table,
+            malformed=getattr(reader, "malformed", None),
+            converter=converter,
+        )
+        inserter = BulkInserter(session, table, columns=columns, ignore_duplicates=True)
+        processed = inserter.run(
+            rows,
+            validator=validator,
+            on_batch=lambda total: progress.update(committed + total),
+            on_commit=progress.publish,
+        )
+        # Rows the parser dropped after the last batch
+        validator.flush()
 
-        # Update Status to SUCCESS
-        job.status = JobStatus.SUCCESS
+        # Update Status to SUCCESS, or PARTIAL when rows were rejected
+        progress.finish(committed + processed)
+        job.rows_rejected = session.scalar(
+            select(func.count())
+            .select_from(CSVReject)
+            .where(CSVReject.job_id == job_id)
+        )
+        job.status = JobStatus.PARTIAL if job.rows_rejected else JobStatus.SUCCESS
         job.error_message = None
         session.commit()
+        publish_job_event(job)
+        IMPORT_PARSE_SECONDS.observe(inserter.read_seconds)
+        if job.rows_per_sec:
+            IMPORT_ROWS_PER_SECOND.observe(job.rows_per_sec)
 
         logger.info(
-            f"[TASK SUCCESS] job_id={job_id} processed {len(bulk_data)} rows."
+            f"[TASK {job.status.value}] job_id={job_id} processed "
+            f"{committed + processed} rows, rejected {job.rows_rejected}."
         )
         delete_file_safe(file_path)
 
@@ -71,9 +219,12 @@ def process_csv_task(self, job_id: int, file_path: str):
         session.rollback()
         # If job object exists, mark failed
         if "job" in locals() and job:
-            job.status = JobStatus.FAILED
+            # Committed batches and the checkpoint are kept: a retry
+            # resumes from there
+            job.status = JobStatus.RETRYING if will_retry else JobStatus.FAILED
             job.error_message = str(e)
             session.commit()
+            publish_job_event(job)
 
         logger.error(f"[TASK FAILED] {e}")
         raise e
@@ -82,30 +233,28 @@ def process_csv_task(self, job_id: int, file_path: str):
 
 
 
-def calculate_delay(file_path: str) -> int:
+@celery.task(name="app.tasks.purge_expired_jobs_task")
+def purge_expired_jobs_task():
     """
-    Logic:
-    Time = N // 4
-    If N < 20 -> 4 sec
-    If N > 100 -> 17 sec
+    Periodic retention run (Celery beat): expired jobs, their rows and
+    files, plus orphaned uploads. Returns what was reclaimed.
     """
-    line_count = 0
+    report = run_retention()
+    logger.info(
+        f"[RETENTION] purged {report.jobs} jobs, {report.rows} rows, "
+        f"{report.files} files ({report.bytes} bytes)"
+    )
+    return asdict(report)
 
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            # Efficiently count lines
-            line_count = sum(1 for _ in f)
-            # Subtract 1 for header if your CSV has headers
-            if line_count > 0:
-                line_count -= 1
-    except Exception:
-        line_count = 0
-
-    calculated_time = line_count // 2
-
-    if line_count < 20:
-        return 10
-    elif line_count > 100:
-        return 40
-    else:
-        return calculated_time
+
+@celery.task(name="app.tasks.maintain_partitions_task")
+def maintain_partitions_task():
+    """
+    Periodic partition upkeep (Celery beat), off the upload path: MySQL
+    csv_data ranges created ahead of new jobs, emptied ones dropped.
+    """
+    with sync_engine.begin() as connection:
+        added, dropped = maintain_partitions(connection)
+    if added or dropped:
+        logger.info(f"[PARTITIONS] added {added} ranges, dropped {dropped}")
+    return {"added": added, "dropped": dropped}
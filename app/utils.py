@@ -1,35 +1,775 @@
 import csv
+import hashlib
+import io
+import mmap
 import os
-import time
-from typing import Iterable, Dict, List
+import re
+from collections import deque
+from dataclasses import dataclass
+from itertools import chain, islice
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 import logging
 
+import billiard
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from .config import CSV_PARSER
+from .multipart import MultipartStream
+from .compression import (
+    DECOMPRESS_ERRORS,
+    check_zip,
+    compression_of,
+    open_decompressed,
+    stream_decompressor,
+)
+
 
 logger = logging.getLogger(__name__)
 
 
-def read_csv_as_dicts(file_path: str, delay: int) -> Iterable[Dict[str, str]]:
+def batched(rows: Iterable, size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most `size` items."""
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class CountingFile:
+    """Binary file wrapper that counts the bytes handed to its reader."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.fp.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        line = self.fp.readline(size)
+        self.bytes_read += len(line)
+        return line
+
+    def __iter__(self) -> Iterator[bytes]:
+        for line in self.fp:
+            self.bytes_read += len(line)
+            yield line
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        # Offsets count from the start of the file, so resumed reads
+        # report absolute positions
+        self.bytes_read = self.fp.seek(offset, whence)
+        return self.bytes_read
+
+    def __getattr__(self, name):
+        return getattr(self.fp, name)
+
+
+class RecordBoundaries:
+    """
+    Exact record boundaries a reader has passed, as (rows before, byte
+    offset) pairs. A resumed import starts at one of them.
+    """
+
+    def __init__(self, row: int = 0, offset: int = 0):
+        self._pending = deque()
+        self.last = (row, offset)
+
+    def add(self, row: int, offset: int):
+        self._pending.append((row, offset))
+
+    def latest(self, rows_committed: int) -> Tuple[int, int]:
+        """Newest boundary with no more than rows_committed rows before it."""
+        while self._pending and self._pending[0][0] <= rows_committed:
+            self.last = self._pending.popleft()
+        return self.last
+
+
+def read_header_record(fp) -> bytes:
+    """
+    Read whole lines until the quotes balance, so a quoted header
+    spanning lines is handled; fp is left at the first data row.
+    """
+    raw = fp.readline()
+    while raw.count(b'"') % 2:
+        line = fp.readline()
+        if not line:
+            break
+        raw += line
+    return raw
+
+
+class MalformedRow(tuple):
+    """
+    Projected values of a record whose field count differs from the
+    header's; rejected by the validation stage (see app.validation).
+    """
+
+    def __new__(cls, values, field_count: int, expected: int):
+        row = super().__new__(cls, values)
+        row.field_count = field_count
+        row.expected = expected
+        return row
+
+    def __getnewargs__(self):
+        return tuple(self), self.field_count, self.expected
+
+
+def resolve_columns(header: Sequence[str], columns: Sequence[str]) -> List[Optional[int]]:
+    """Map wanted column names to header positions once (None = absent)."""
+    positions = {name.strip(): i for i, name in enumerate(header)}
+    return [positions.get(name) for name in columns]
+
+
+def project_rows(
+    rows: List[list], indexes: Sequence[Optional[int]], width: Optional[int] = None
+) -> List[tuple]:
+    """
+    Project a batch of csv.reader rows onto `indexes` and strip values.
+
+    Full-width batches take a column-wise path (itemgetter + str.strip
+    mapped per column); batches with short rows or absent columns fall
+    back to per-row handling, padding with None like csv.DictReader.
+    With `width` (the header's field count), rows of any other length
+    come back as MalformedRow.
+    """
+    rows = [row for row in rows if row]
+    if not rows:
+        return []
+
+    if None not in indexes:
+        needed = max(indexes) + 1
+        if width is not None:
+            full = width >= needed and all(len(row) == width for row in rows)
+        else:
+            full = all(len(row) >= needed for row in rows)
+        if full:
+            if len(indexes) == 1:
+                return [(row[indexes[0]].strip(),) for row in rows]
+            getter = itemgetter(*indexes)
+            picked = map(getter, rows)
+            return list(zip(*(list(map(str.strip, column)) for column in zip(*picked))))
+
+    projected = [
+        tuple(
+            row[i].strip() if i is not None and i < len(row) else None
+            for i in indexes
+        )
+        for row in rows
+    ]
+    if width is not None:
+        projected = [
+            values if len(row) == width else MalformedRow(values, len(row), width)
+            for row, values in zip(rows, projected)
+        ]
+    return projected
+
+
+class StdlibCSVParser:
+    """
+    Pure-stdlib backend: csv.reader with one-time header resolution.
+    fp stops exactly at the end of each batch, so batch ends are exact
+    record boundaries (usable as checkpoints). Records with the wrong
+    field count are yielded in place as MalformedRow.
+    """
+
+    name = "stdlib"
+    exact_offsets = True
+
+    def iter_batches(
+        self,
+        fp,
+        columns: Sequence[str],
+        batch_size: int,
+        encoding: str = "utf-8",
+        start_offset: Optional[int] = None,
+        malformed: Optional[list] = None,
+    ) -> Iterator[List[tuple]]:
+        # Split on b"\n" before decoding: it never occurs inside a
+        # multi-byte UTF-8 sequence, and keeps byte counts exact.
+        header = read_header_record(fp).decode(encoding)
+        names = next(csv.reader(io.StringIO(header, newline="")), [])
+        indexes = resolve_columns(names, columns)
+        if start_offset is not None:
+            fp.seek(start_offset)
+        reader = csv.reader(raw.decode(encoding) for raw in fp)
+        for chunk in batched(reader, batch_size):
+            batch = project_rows(chunk, indexes, width=len(names))
+            if batch:
+                yield batch
+
+
+class ArrowCSVParser:
     """
-    Read CSV file row by row and yield each row as a dictionary.
-    Uses CSV header fields as keys.
+    pyarrow backend: multithreaded columnar parsing, whitespace trimmed
+    per column with pyarrow.compute. Batches follow Arrow's block size
+    rather than batch_size.
 
-    -> Memory efficient (streams rows instead of loading full file)
-    -> Use inside Celery task while extracting
+    Arrow leaves out records with the wrong field count; they are parsed
+    again from the text it reports and put back at their row number as
+    MalformedRow, so rows match the stdlib backend. Records Arrow cannot
+    number go to `malformed` as (reason, text) when given.
 
-    Example output:
-    {"name": "John", "role": "Dev", "loc": "NY", "extra": "..."}
+    Arrow reads ahead by blocks, so batch ends are not exact record
+    boundaries.
     """
 
-    with open(file_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        time.sleep(delay)
+    name = "pyarrow"
+    exact_offsets = False
+
+    def __init__(self, block_size: int = 4 * 1024 * 1024):
+        import pyarrow.csv  # noqa: F401  (fail early when unavailable)
+
+        self.block_size = block_size
+
+    def iter_batches(
+        self,
+        fp,
+        columns: Sequence[str],
+        batch_size: int,
+        encoding: str = "utf-8",
+        start_offset: Optional[int] = None,
+        malformed: Optional[list] = None,
+    ) -> Iterator[List[tuple]]:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pacsv
+
+        header = self._read_header(fp, encoding)
+        if start_offset is not None:
+            fp.seek(start_offset)
+        raw_names = {name.strip(): name for name in header}
+        present = [raw_names[c] for c in columns if c in raw_names]
+        indexes = resolve_columns(header, columns)
+        # (row number, text) of records left out of the batches, in order
+        invalid = deque()
+        unnumbered = 0
 
-        for row in reader:
-            yield {
-                k.strip(): v.strip() if isinstance(v, str) else v
-                for k, v in row.items()
+        def on_invalid_row(row):
+            nonlocal unnumbered
+            if row.number is not None:
+                invalid.append((row.number, row.text))
+                return "skip"
+            unnumbered += 1
+            if malformed is not None:
+                reason = (
+                    f"expected {row.expected_columns} fields, "
+                    f"got {row.actual_columns}"
+                )
+                malformed.append((reason, row.text))
+            return "skip"
+
+        def parse_invalid(text: str) -> List[tuple]:
+            fields = next(csv.reader(io.StringIO(text, newline="")), [])
+            return project_rows([fields], indexes, width=len(header))
+
+        reader = pacsv.open_csv(
+            fp,
+            read_options=pacsv.ReadOptions(
+                column_names=header, block_size=self.block_size, encoding=encoding
+            ),
+            parse_options=pacsv.ParseOptions(
+                newlines_in_values=True, invalid_row_handler=on_invalid_row
+            ),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=present,
+                column_types={name: pa.string() for name in present},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+        number = 0  # Arrow row numbers passed, kept rows and left out ones
+        for record_batch in reader:
+            if not record_batch.num_rows:
+                continue
+            values = {
+                name: pc.utf8_trim_whitespace(record_batch.column(name)).to_pylist()
+                for name in present
             }
-        f.close()
+            missing = [None] * record_batch.num_rows
+            rows = list(
+                zip(*(values[raw_names[c]] if c in raw_names else missing for c in columns))
+            )
+            if invalid:
+                rows, number = self._merge(rows, invalid, number, parse_invalid)
+            else:
+                number += len(rows)
+            if rows:
+                yield rows
+
+        # Records after the last kept row
+        tail = []
+        while invalid:
+            tail.extend(parse_invalid(invalid.popleft()[1]))
+        if tail:
+            yield tail
+        if unnumbered:
+            logger.warning(f"[PARSER] pyarrow skipped {unnumbered} malformed rows")
+
+    @staticmethod
+    def _merge(
+        rows: List[tuple], invalid: deque, number: int, parse_invalid
+    ) -> Tuple[List[tuple], int]:
+        """
+        Put the left out records numbered within this batch back in
+        place; `number` is the Arrow row number reached before it.
+        Returns the rows and the row number reached after them.
+        """
+        merged, start = [], 0
+        while invalid:
+            row_number, text = invalid[0]
+            before = max(row_number - 1 - number, 0)  # kept rows ahead of it
+            if before > len(rows) - start:
+                break
+            merged.extend(rows[start : start + before])
+            merged.extend(parse_invalid(text))
+            invalid.popleft()
+            start += before
+            number += before + 1
+        merged.extend(rows[start:])
+        return merged, number + len(rows) - start
+
+    @staticmethod
+    def _read_header(fp, encoding: str) -> List[str]:
+        raw = read_header_record(fp)
+        return next(csv.reader(io.StringIO(raw.decode(encoding), newline="")), [])
+
+
+def get_csv_parser(name: str = CSV_PARSER):
+    """
+    Return a parser backend: "stdlib", "pyarrow" or "auto" (pyarrow when
+    installed, stdlib otherwise).
+    """
+    if name in ("auto", "pyarrow"):
+        try:
+            return ArrowCSVParser()
+        except ImportError:
+            if name == "pyarrow":
+                logger.warning("[PARSER] pyarrow not installed, using stdlib parser")
+    return StdlibCSVParser()
+
+
+class CSVReader:
+    """
+    Stream selected columns of a CSV file as tuples through a parser
+    backend, tracking bytes and rows consumed for progress reporting.
+
+    start_offset / start_row resume at a record boundary (see
+    RecordBoundaries); rows_read counts rows from there. Records a
+    backend drops instead of yielding collect in `malformed`.
+
+    Compressed files are decompressed while parsed: bytes_read counts
+    compressed bytes, and no record boundaries are recorded (a retry
+    re-parses from the top).
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        columns: Sequence[str],
+        parser=None,
+        batch_size: int = 5000,
+        encoding: str = "utf-8",
+        start_offset: Optional[int] = None,
+        start_row: int = 0,
+    ):
+        self.file_path = file_path
+        self.columns = tuple(columns)
+        self.parser = parser or get_csv_parser()
+        self.batch_size = batch_size
+        self.encoding = encoding
+        self.start_offset = start_offset
+        self.start_row = start_row
+        self.rows_read = 0
+        self.boundaries = RecordBoundaries(start_row, start_offset or 0)
+        self.malformed = []
+        self.compression = compression_of(file_path)
+        self.exact_offsets = self.parser.exact_offsets and self.compression is None
+        self._counter = None
+
+    @property
+    def bytes_read(self) -> int:
+        return self._counter.bytes_read if self._counter else 0
+
+    def iter_batches(self) -> Iterator[List[tuple]]:
+        with open(self.file_path, "rb") as fp:
+            self._counter = CountingFile(fp)
+            for batch in self.parser.iter_batches(
+                open_decompressed(self._counter, self.compression),
+                self.columns,
+                self.batch_size,
+                self.encoding,
+                start_offset=self.start_offset,
+                malformed=self.malformed,
+            ):
+                self.rows_read += len(batch)
+                if self.exact_offsets:
+                    self.boundaries.add(
+                        self.start_row + self.rows_read, self._counter.bytes_read
+                    )
+                yield batch
+
+    def __iter__(self) -> Iterator[tuple]:
+        return chain.from_iterable(self.iter_batches())
+
+
+# Text outside quoted fields, and quoted fields that open at a field
+# start: csv.reader and a plain scan agree on where these end.
+# Written without possessive quantifiers (Python 3.11+)
+_PLAIN_CSV = re.compile(rb'[^"]*(?:(?<=[,\r\n])"[^"]*(?:""[^"]*)*"[^"]*)*')
+# Bytes per match: re keeps backtracking state for every repetition of
+# the group above, so unbounded matches grow with the data
+_PLAIN_CSV_WINDOW = 64 * 1024
+
+
+def _skip_quote(data, pos: int) -> int:
+    """
+    Step past the quote at pos, read outside a quoted field the way
+    csv.reader does: it opens a field only at the field's start (up to
+    its closing quote; "" inside is escaped), anywhere else it is text.
+    """
+    if pos and data[pos - 1 : pos] not in (b",", b"\r", b"\n"):
+        return pos + 1
+    pos += 1
+    while True:
+        quote = data.find(b'"', pos)
+        if quote == -1:
+            return len(data)
+        if data[quote + 1 : quote + 2] != b'"':
+            return quote + 1
+        pos = quote + 2
+
+
+def find_record_boundaries(
+    file_path: str,
+    chunk_bytes: int,
+    start: int = 0,
+) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Split a CSV file into byte ranges of roughly chunk_bytes that start
+    and end on record boundaries.
+
+    Quotes are followed the way csv.reader reads them, so neither
+    newlines in quoted fields nor stray quotes in unquoted ones (5'10")
+    move a split into a record. Well-formed text is skipped with regex
+    matches over the memory-mapped file; other quotes are stepped one by one.
+
+    start > 0 must be a record boundary (a checkpoint); data starts there.
+
+    returns (data_start, [(start, end), ...]) covering the data rows
+    """
+    file_size = os.path.getsize(file_path)
+    if not file_size:
+        return 0, []
+    boundaries = [start] if start else []
+    # first boundary wanted: end of the header record
+    target = start + chunk_bytes if start else 0
+    pos = start  # always outside a quoted field
+
+    with open(file_path, "rb") as fp, mmap.mmap(
+        fp.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        while target < file_size:
+            if pos < target:
+                end = min(target, pos + _PLAIN_CSV_WINDOW)
+                pos = _PLAIN_CSV.match(data, pos, end).end()
+                if pos < end:
+                    # a quote the pattern does not cover, or a quoted
+                    # field running past the window
+                    pos = _skip_quote(data, pos)
+                continue
+            newline = data.find(b"\n", pos)
+            if newline == -1:
+                break
+            quote = data.find(b'"', pos, newline)
+            if quote != -1:
+                pos = _skip_quote(data, quote)
+                continue
+            pos = newline + 1
+            boundaries.append(pos)
+            target = pos + chunk_bytes
+
+    if not boundaries:
+        return file_size, []
+
+    header_end = boundaries[0]
+    edges = [b for b in boundaries if b < file_size] + [file_size]
+    ranges = [(start, end) for start, end in zip(edges, edges[1:]) if end > start]
+    return header_end, ranges
+
+
+def read_csv_header(file_path: str, encoding: str = "utf-8") -> List[str]:
+    """Parse the header record into stripped names."""
+    with open(file_path, "rb") as fp:
+        raw = read_header_record(open_decompressed(fp, compression_of(file_path)))
+    header = next(csv.reader(io.StringIO(raw.decode(encoding), newline="")), [])
+    return [name.strip() for name in header]
+
+
+def parse_csv_range(
+    file_path: str,
+    start: int,
+    end: int,
+    indexes: Sequence[Optional[int]],
+    encoding: str = "utf-8",
+    width: Optional[int] = None,
+) -> List[tuple]:
+    """
+    Parse the records in bytes [start, end) and project them to tuples.
+    indexes[i] is the source column for output field i (None = missing);
+    width is the header's field count (see project_rows).
+
+    Top-level so it can run in a process pool.
+    """
+    with open(file_path, "rb") as fp:
+        fp.seek(start)
+        data = fp.read(end - start)
+
+    reader = csv.reader(io.StringIO(data.decode(encoding), newline=""))
+    return project_rows(list(reader), indexes, width)
+
+
+class ParallelCSVReader:
+    """
+    Parse one large CSV across a process pool.
+
+    -> File split into record-aligned byte ranges (find_record_boundaries)
+    -> Ranges parsed in a billiard pool, at most 2 per worker ahead and
+       at most max_in_flight_bytes of ranges parsed but not yet yielded
+    -> Rows yielded as tuples of `columns`, in file order
+
+    Exposes bytes_read / rows_read like CSVReader for progress reporting;
+    every range end is an exact record boundary (see CSVReader).
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        columns: Sequence[str],
+        chunk_bytes: int,
+        workers: int,
+        max_in_flight_bytes: int,
+        encoding: str = "utf-8",
+        start_offset: Optional[int] = None,
+        start_row: int = 0,
+    ):
+        self.file_path = file_path
+        self.columns = tuple(columns)
+        self.chunk_bytes = chunk_bytes
+        self.workers = workers
+        self.max_in_flight_bytes = max_in_flight_bytes
+        self.encoding = encoding
+        self.start_offset = start_offset
+        self.start_row = start_row
+        self.bytes_read = 0
+        self.rows_read = 0
+        self.boundaries = RecordBoundaries(start_row, start_offset or 0)
+
+    def __iter__(self) -> Iterator[tuple]:
+        data_start, ranges = find_record_boundaries(
+            self.file_path, self.chunk_bytes, start=self.start_offset or 0
+        )
+        header = read_csv_header(self.file_path, self.encoding)
+        indexes = resolve_columns(header, self.columns)
+        width = len(header)
+        self.bytes_read = data_start
+
+        # billiard (Celery's multiprocessing fork) starts pools from daemonic
+        # processes too, i.e. prefork pool children. spawn: the API process
+        # runs threads, which fork does not mix with
+        context = billiard.get_context("spawn")
+        with context.Pool(processes=self.workers) as pool:
+            todo = deque(ranges)
+            pending = deque()
+            # bytes of the ranges in `pending` and the one being yielded
+            in_flight = 0
+
+            def fill():
+                nonlocal in_flight
+                while todo and len(pending) < self.workers * 2:
+                    start, end = todo[0]
+                    if in_flight and in_flight + end - start > self.max_in_flight_bytes:
+                        break
+                    todo.popleft()
+                    in_flight += end - start
+                    result = pool.apply_async(
+                        parse_csv_range,
+                        (self.file_path, start, end, indexes, self.encoding, width),
+                    )
+                    pending.append((start, end, result))
+
+            fill()
+            while pending:
+                start, end, result = pending.popleft()
+                rows = result.get()
+                fill()
+                for row in rows:
+                    self.rows_read += 1
+                    yield row
+                del rows
+                self.bytes_read = end
+                self.boundaries.add(self.start_row + self.rows_read, end)
+                in_flight -= end - start
+                fill()
+
+
+@dataclass
+class StoredUpload:
+    """Result of streaming an upload to disk."""
+
+    size: int
+    total_rows: Optional[int]
+    sha256: str
+
+
+class AsyncFileReader:
+    """
+    UploadFile-style async read() over a blocking binary file (e.g. a
+    zip member), reading in the threadpool.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+
+    async def read(self, size: int = -1) -> bytes:
+        return await run_in_threadpool(self.fp.read, size)
+
+
+class UploadScanner:
+    """
+    Size, SHA-256 and line-based row count of an upload, fed chunk by
+    chunk. Compressed uploads are counted on the decompressed stream,
+    capped at max_csv_size (413); corrupt or truncated data is a 400.
+    Zip members are only checked by finish(), and their rows are not
+    counted.
+    """
+
+    def __init__(
+        self, compression: Optional[str] = None, max_csv_size: Optional[int] = None
+    ):
+        self.compression = compression
+        self.max_csv_size = max_csv_size
+        self.size = 0
+        self.csv_size = 0
+        self.newlines = 0
+        self.last_byte = b"\n"
+        self.hasher = hashlib.sha256()
+        self.decompressor = stream_decompressor(compression)
+
+    def feed(self, chunk: bytes):
+        # hashlib releases the GIL on large buffers; call this from the
+        # threadpool, never on the event loop
+        self.size += len(chunk)
+        self.hasher.update(chunk)
+        if self.decompressor is None:
+            self._count(chunk)
+            return
+        try:
+            # Bounded pieces: the size cap stops a zip bomb before it
+            # is inflated any further
+            self.decompressor.decompress(chunk, self._count)
+        except DECOMPRESS_ERRORS as e:
+            raise HTTPException(400, f"Invalid compressed data: {e}")
+
+    def _count(self, data: bytes):
+        self.csv_size += len(data)
+        if self.max_csv_size is not None and self.csv_size > self.max_csv_size:
+            raise _csv_too_large(self.max_csv_size)
+        if data:
+            self.newlines += data.count(b"\n")
+            self.last_byte = data[-1:]
+
+    def finish(self, file_path: str) -> StoredUpload:
+        """Checks that need the whole file; call once it is complete."""
+        if self.decompressor is not None and not self.decompressor.finished:
+            raise HTTPException(400, "Invalid compressed data: stream is truncated")
+        total_rows = None
+        if self.compression == "zip":
+            try:
+                self.csv_size = check_zip(file_path)
+            except ValueError as e:
+                raise HTTPException(400, str(e))
+            if self.max_csv_size is not None and self.csv_size > self.max_csv_size:
+                raise _csv_too_large(self.max_csv_size)
+        else:
+            lines = self.newlines + (0 if self.last_byte == b"\n" else 1)
+            total_rows = max(lines - 1, 0)
+        return StoredUpload(
+            size=self.size, total_rows=total_rows, sha256=self.hasher.hexdigest()
+        )
+
+
+def _write_chunk(fp, scanner: UploadScanner, chunk: bytes):
+    scanner.feed(chunk)
+    fp.write(chunk)
+
+
+def _csv_too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        413, f"Decompressed file too large. Maximum allowed size is {limit} bytes"
+    )
+
+
+async def save_upload_stream(
+    upload: Union[UploadFile, AsyncFileReader, MultipartStream],
+    file_path: str,
+    max_size: int,
+    chunk_size: int,
+    compression: Optional[str] = None,
+    max_csv_size: Optional[int] = None,
+) -> StoredUpload:
+    """
+    Copy an upload (anything with an async read(size)) to disk in chunks.
+
+    -> Constant memory (one chunk resident at a time)
+    -> File writes run in the threadpool, never on the event loop
+    -> Aborts with 413 as soon as max_size is exceeded
+    -> Counts rows and computes SHA-256 on the fly (see UploadScanner)
+    -> Compressed uploads are stored as sent
+
+    total_rows is a line-based count (header excluded); quoted fields that
+    contain newlines are counted as extra lines.
+    """
+    scanner = UploadScanner(compression, max_csv_size)
+
+    fp = await run_in_threadpool(open, file_path, "wb")
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            if scanner.size + len(chunk) > max_size:
+                raise HTTPException(
+                    413, f"File too large. Maximum allowed size is {max_size} bytes"
+                )
+            await run_in_threadpool(_write_chunk, fp, scanner, chunk)
+
+        await run_in_threadpool(fp.close)
+        return await run_in_threadpool(scanner.finish, file_path)
+    except BaseException:
+        await run_in_threadpool(fp.close)
+        delete_file_safe(file_path)
+        raise
+
+
+def scan_stored_upload(
+    file_path: str,
+    chunk_size: int,
+    compression: Optional[str] = None,
+    max_csv_size: Optional[int] = None,
+) -> StoredUpload:
+    """
+    save_upload_stream's checks for a file already on disk (e.g. an
+    assembled resumable upload). Blocking; run it in the threadpool.
+    """
+    scanner = UploadScanner(compression, max_csv_size)
+    with open(file_path, "rb") as fp:
+        while chunk := fp.read(chunk_size):
+            scanner.feed(chunk)
+    return scanner.finish(file_path)
 
 
 def validate_csv_columns(file_path: str, required_cols: List[str]) -> bool:
@@ -38,12 +778,8 @@ def validate_csv_columns(file_path: str, required_cols: List[str]) -> bool:
 
     returns True if valid else False
     """
-
-    with open(file_path, newline="", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        headers = next(reader)
-
-        return all(col in headers for col in required_cols)
+    headers = read_csv_header(file_path)
+    return all(col in headers for col in required_cols)
 
 
 def is_csv(filename: str) -> bool:
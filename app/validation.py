@@ -0,0 +1,174 @@
+"""
+This module validates parsed rows before they are inserted.
+
+Rules come from CSVDataCreate (plus the column lengths of the target
+table) and are checked column-wise per batch, instead of building one
+Pydantic model per row. Rejected rows go to csv_rejects with a reason.
+"""
+
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Table, insert
+from sqlalchemy.orm import Session
+
+from .config import VALIDATE_FIELD_COUNT
+from .models import CSVReject
+from .schemas import CSVDataCreate
+from .utils import MalformedRow
+
+
+REASON_MAX_LENGTH = CSVReject.__table__.c.reason.type.length
+
+
+def compile_rules(
+    fields: Sequence[str], schema=CSVDataCreate, table: Optional[Table] = None
+) -> List[Tuple[int, str, Optional[int], bool]]:
+    """
+    (position, field, max_length, required) per field, from the schema's
+    constraints; a String(n) column of `table` caps max_length too.
+    """
+    rules = []
+    for position, name in enumerate(fields):
+        info = schema.model_fields.get(name)
+        max_length, required = None, False
+        if info is not None:
+            required = info.is_required()
+            max_length = next(
+                (m.max_length for m in info.metadata if hasattr(m, "max_length")),
+                None,
+            )
+        if table is not None and name in table.c:
+            length = getattr(table.c[name].type, "length", None)
+            if length is not None:
+                max_length = min(max_length or length, length)
+        if max_length is not None or required:
+            rules.append((position, name, max_length, required))
+    return rules
+
+
+class RejectWriter:
+    """Buffers rejects in memory; flush() writes them in the caller's transaction."""
+
+    def __init__(self, session: Session, job_id: int):
+        self.session = session
+        self.job_id = job_id
+        self.pending = []
+        self.written = 0
+
+    def add(self, row_number: Optional[int], reason: str, data: str):
+        self.pending.append(
+            {
+                "job_id": self.job_id,
+                "row_number": row_number,
+                "reason": reason[:REASON_MAX_LENGTH],
+                "data": data,
+            }
+        )
+
+    def flush(self):
+        if not self.pending:
+            return
+        statement = (
+            insert(CSVReject.__table__)
+            .prefix_with("OR IGNORE", dialect="sqlite")
+            .prefix_with("IGNORE", dialect="mysql")
+        )
+        self.session.execute(statement, self.pending)
+        self.written += len(self.pending)
+        self.pending = []
+
+
+class RowValidator:
+    """
+    Split batches of (row_number, values) into insertable rows
+    (job_id, row_number, *values) and rejects.
+
+    -> Column-wise checks: one max(len) per column per batch; rows are
+       only inspected one by one when a column fails
+    -> MalformedRow (wrong field count) rejected when check_field_count
+    -> Rows the parser dropped (`malformed`, as (reason, text)) are
+       recorded without a row number
+    -> With a converter (see app.mapping), values follow its `sources`
+       and are converted to `fields` first; rejects keep the raw values
+    """
+
+    def __init__(
+        self,
+        job_id: int,
+        fields: Sequence[str],
+        sink: RejectWriter,
+        table: Optional[Table] = None,
+        malformed: Optional[list] = None,
+        schema=CSVDataCreate,
+        check_field_count: bool = VALIDATE_FIELD_COUNT,
+        converter=None,
+    ):
+        self.job_id = job_id
+        self.fields = tuple(fields)
+        self.converter = converter
+        self.sources = converter.sources if converter is not None else self.fields
+        self.sink = sink
+        self.malformed = malformed
+        self.check_field_count = check_field_count
+        self.rules = compile_rules(self.fields, schema, table)
+        self.rejected = 0
+
+    @staticmethod
+    def _data(names: Sequence[str], values: Sequence) -> str:
+        return json.dumps(dict(zip(names, values)), ensure_ascii=False)
+
+    def split(self, batch: List[Tuple[int, tuple]]) -> List[tuple]:
+        reasons: Dict[int, str] = {}
+        if self.check_field_count:
+            for i, (_, values) in enumerate(batch):
+                if type(values) is MalformedRow:
+                    reasons[i] = (
+                        f"expected {values.expected} fields, got {values.field_count}"
+                    )
+
+        raw = batch
+        if self.converter is not None:
+            batch = self.converter.convert(batch, reasons)
+
+        for position, name, max_length, required in self.rules:
+            column = [values[position] for _, values in batch]
+            if required and None in column:
+                for i, value in enumerate(column):
+                    if value is None:
+                        reasons.setdefault(i, f"{name}: required")
+            if max_length is not None:
+                if max(map(len, filter(None, column)), default=0) > max_length:
+                    for i, value in enumerate(column):
+                        if value and len(value) > max_length:
+                            reasons.setdefault(
+                                i, f"{name}: longer than {max_length} characters"
+                            )
+
+        job_id = self.job_id
+        if not reasons:
+            return [(job_id, row_number, *values) for row_number, values in batch]
+
+        rows = []
+        for i, (row_number, values) in enumerate(batch):
+            reason = reasons.get(i)
+            if reason is None:
+                rows.append((job_id, row_number, *values))
+            else:
+                self.sink.add(row_number, reason, self._data(self.sources, raw[i][1]))
+        self.rejected += len(reasons)
+        return rows
+
+    def reject(self, row: tuple, error: Exception):
+        """Record an insert tuple the database refused."""
+        message = str(getattr(error, "orig", error))
+        data = self._data(self.fields, row[2:])
+        self.sink.add(row[1], f"database error: {message}", data)
+        self.rejected += 1
+
+    def flush(self):
+        while self.malformed:
+            reason, text = self.malformed.pop(0)
+            self.sink.add(None, reason, text)
+            self.rejected += 1
+        self.sink.flush()
@@ -0,0 +1,8 @@
+"""
+Benchmarks for the import pipeline. Run modules with `python -m benchmarks.<name>`.
+
+-> generate: deterministic synthetic CSVs (1k to 10M+ rows)
+-> pipeline: end-to-end import + API polling, JSON report
+-> compare: diff two pipeline reports
+-> parsers: parser backends side by side
+"""
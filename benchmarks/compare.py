@@ -0,0 +1,80 @@
+"""
+Compare two benchmarks.pipeline reports, e.g. from two commits.
+
+    python -m benchmarks.compare base.json new.json --threshold 0.10
+
+Runs are matched on (rows, shape, quoting, text). Prints the relative
+change per metric and exits with status 1 when any metric regressed by
+more than --threshold.
+"""
+
+import argparse
+import json
+import sys
+from typing import Optional
+
+
+# metric -> True when higher is better
+METRICS = {
+    "rows_per_sec": True,
+    "peak_rss_mb": False,
+    "stages.parse": False,
+    "stages.validate": False,
+    "stages.insert": False,
+    "stages.commit": False,
+    "api.p50_ms": False,
+    "api.p99_ms": False,
+}
+
+
+def _key(result: dict) -> tuple:
+    return (result["rows"], result["shape"], result["quoting"], result["text"])
+
+
+def _value(result: dict, metric: str) -> Optional[float]:
+    value = result
+    for part in metric.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare(base: dict, new: dict, threshold: float) -> int:
+    """Print the comparison; returns the number of regressions."""
+    baseline = {_key(result): result for result in base["results"]}
+    regressions = 0
+    print(f"base {base.get('commit') or '?'} -> new {new.get('commit') or '?'}")
+    for result in new["results"]:
+        old = baseline.get(_key(result))
+        if old is None:
+            continue
+        print("{} rows, {}/{}/{}".format(*_key(result)))
+        for metric, higher_is_better in METRICS.items():
+            before, after = _value(old, metric), _value(result, metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"  {metric:>16}: {before:>12} -> {after:>12} ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.base) as fp:
+        base = json.load(fp)
+    with open(args.new) as fp:
+        new = json.load(fp)
+    sys.exit(1 if compare(base, new, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+End-to-end import benchmark against a throwaway SQLite database.
+
+    python -m benchmarks.pipeline --rows 1000 100000 1000000 --out results.json
+
+For each size: generate a CSV (benchmarks.generate), upload it to a
+real uvicorn server with the in-process worker pool, and poll
+GET /jobs/{job_id} from --pollers threads until the import finishes.
+
+Reported per run, as JSON:
+-> rows_per_sec (worker, started_at..finished_at) and end_to_end_s
+-> peak_rss_mb of this process (API + worker), reset per run on Linux
+-> stages: upload (request time), parse (inserter waiting on the
+   reader), validate, insert, commit, in seconds
+-> api: p50 / p99 / max latency of the status polls, in ms
+
+Compare two result files with `python -m benchmarks.compare`.
+Needs httpx (installed with FastAPI's test client).
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+from .generate import QUOTINGS, SHAPES, TEXTS, generate
+
+
+TERMINAL_STATUSES = ("SUCCESS", "PARTIAL", "FAILED")
+
+
+def configure_environment(workdir: str, args) -> None:
+    """Point the app at a scratch database before it is imported."""
+    db_path = os.path.join(workdir, "bench.db")
+    os.environ.update(
+        {
+            "DATABASE_URL_ASYNC": f"sqlite+aiosqlite:///{db_path}",
+            "DATABASE_URL_SYNC": f"sqlite:///{db_path}",
+            "DATABASE_URL_READ": "",
+            # In-process worker pool, no broker
+            "CELERY_BROKER_URL": "memory://",
+            "CELERY_RESULT_BACKEND": "cache+memory://",
+            "DEDUPLICATE_UPLOADS": "False",
+            "BCRYPT_ROUNDS": "4",
+            "CSV_PARSER": args.parser,
+        }
+    )
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("ENCODE_ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_LIFE_MINUIT", "60")
+
+
+class StageTimer:
+    """
+    Accumulate time spent in the import stages by wrapping the worker's
+    methods for the duration of a run. Commits are only counted inside
+    BulkInserter.run, so API sessions do not show up.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self._local = threading.local()
+
+    def _timed(self, stage: str, func, only_in_run: bool = False):
+        timer = self
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if only_in_run and not getattr(timer._local, "in_run", False):
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer.seconds[stage] += time.perf_counter() - started
+
+        return wrapper
+
+    def _timed_run(self, func):
+        timer = self
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timer._local.in_run = True
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer.seconds["run"] += time.perf_counter() - started
+                timer._local.in_run = False
+
+        return wrapper
+
+    @contextmanager
+    def installed(self):
+        from sqlalchemy.orm import Session
+
+        from app.bulk import BulkInserter
+        from app.validation import RowValidator
+
+        patches = [
+            (BulkInserter, "run", self._timed_run(BulkInserter.run)),
+            (
+                BulkInserter,
+                "insert_batch",
+                self._timed("insert", BulkInserter.insert_batch),
+            ),
+            (RowValidator, "split", self._timed("validate", RowValidator.split)),
+            (
+                Session,
+                "commit",
+                self._timed("commit", Session.commit, only_in_run=True),
+            ),
+        ]
+        originals = [
+            (owner, name, owner.__dict__[name]) for owner, name, _ in patches
+        ]
+        for owner, name, wrapper in patches:
+            setattr(owner, name, wrapper)
+        try:
+            yield self
+        finally:
+            for owner, name, original in originals:
+                setattr(owner, name, original)
+
+    def stages(self) -> dict:
+        seconds = self.seconds
+        parse = seconds["run"] - sum(
+            seconds[stage] for stage in ("insert", "validate", "commit")
+        )
+        return {
+            "upload": round(seconds["upload"], 4),
+            "parse": round(max(parse, 0.0), 4),
+            "validate": round(seconds["validate"], 4),
+            "insert": round(seconds["insert"], 4),
+            "commit": round(seconds["commit"], 4),
+        }
+
+
+def reset_peak_rss() -> None:
+    """Linux: restart the VmHWM high-water mark, so each run has its own peak."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fp:
+            fp.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as fp:
+            for line in fp:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # Lifetime peak; kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(int(round(q / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def running_server():
+    import uvicorn
+
+    from app.main import app
+
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn failed to start")
+        time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def register(client) -> dict:
+    response = client.post(
+        "/auth/register",
+        json={
+            "email": "bench@example.com",
+            "username": "bench",
+            "password": "Bench1234",
+        },
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def poll_until_done(
+    base_url: str, headers: dict, job_id: int, interval: float, latencies: list
+):
+    import httpx
+
+    with httpx.Client(base_url=base_url, headers=headers, timeout=60) as client:
+        while True:
+            started = time.perf_counter()
+            response = client.get(f"/jobs/{job_id}")
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+            if response.json()["status"] in TERMINAL_STATUSES:
+                return
+            time.sleep(interval)
+
+
+def run_case(base_url: str, headers: dict, workdir: str, rows: int, args) -> dict:
+    import httpx
+
+    name = f"bench-{rows}-{args.shape}-{args.quoting}-{args.text}.csv"
+    path = os.path.join(workdir, name)
+    size = generate(path, rows, args.shape, args.quoting, args.text, args.seed)
+
+    timer = StageTimer()
+    latencies = []
+    reset_peak_rss()
+    client = httpx.Client(base_url=base_url, headers=headers, timeout=None)
+    with timer.installed(), client:
+        started = time.perf_counter()
+        with open(path, "rb") as fp:
+            response = client.post("/upload", files={"file": (name, fp, "text/csv")})
+        timer.seconds["upload"] = time.perf_counter() - started
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+
+        pollers = [
+            threading.Thread(
+                target=poll_until_done,
+                args=(base_url, headers, job_id, args.poll_interval, latencies),
+            )
+            for _ in range(args.pollers)
+        ]
+        for poller in pollers:
+            poller.start()
+        for poller in pollers:
+            poller.join()
+        end_to_end = time.perf_counter() - started
+        job = client.get(f"/jobs/{job_id}").json()
+
+    os.remove(path)
+    import_seconds = None
+    if job.get("started_at") and job.get("finished_at"):
+        import_seconds = (
+            datetime.fromisoformat(job["finished_at"])
+            - datetime.fromisoformat(job["started_at"])
+        ).total_seconds()
+    latencies_ms = [value * 1000 for value in latencies]
+    return {
+        "rows": rows,
+        "shape": args.shape,
+        "quoting": args.quoting,
+        "text": args.text,
+        "file_bytes": size,
+        "status": job["status"],
+        "rows_processed": job["rows_processed"],
+        "rows_rejected": job.get("rows_rejected", 0),
+        "import_s": import_seconds,
+        "end_to_end_s": round(end_to_end, 4),
+        "rows_per_sec": (
+            round(job["rows_processed"] / import_seconds, 1) if import_seconds else None
+        ),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": timer.stages(),
+        "api": {
+            "requests": len(latencies_ms),
+            "p50_ms": round(percentile(latencies_ms, 50), 2),
+            "p99_ms": round(percentile(latencies_ms, 99), 2),
+            "max_ms": round(max(latencies_ms), 2),
+        },
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100_000])
+    parser.add_argument("--shape", choices=SHAPES, default="narrow")
+    parser.add_argument("--quoting", choices=QUOTINGS, default="minimal")
+    parser.add_argument("--text", choices=TEXTS, default="ascii")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--parser", default="auto", help="CSV_PARSER for the worker")
+    parser.add_argument(
+        "--pollers", type=int, default=8, help="concurrent status pollers"
+    )
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="importer-bench-")
+    configure_environment(workdir, args)
+
+    import httpx
+
+    results = []
+    try:
+        with running_server() as base_url:
+            with httpx.Client(base_url=base_url) as client:
+                headers = register(client)
+            for rows in args.rows:
+                result = run_case(base_url, headers, workdir, rows, args)
+                print(
+                    f"{rows} rows: {result['rows_per_sec']} rows/s, "
+                    f"peak {result['peak_rss_mb']} MiB, "
+                    f"api p99 {result['api']['p99_ms']} ms",
+                    file=sys.stderr,
+                )
+                results.append(result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parser": args.parser,
+        "pollers": args.pollers,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fp:
+            fp.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+# Small hand-checkable samples. For large, deterministic files (and
+# wide / quoted / unicode variants) use: python -m benchmarks.generate
 import csv
 import os
 from faker import Faker
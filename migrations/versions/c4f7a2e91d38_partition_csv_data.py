@@ -0,0 +1,32 @@
+"""partition-csv-data
+
+Revision ID: c4f7a2e91d38
+Revises: a6e3d9b08f21
+Create Date: 2026-10-17 19:46:12.531904
+
+Intentionally empty. This revision used to RANGE-partition MySQL's
+csv_data when CSV_DATA_STORAGE=partitioned was set while it ran, which
+made the migrated schema depend on the environment. Partitioning is now
+an explicit step: python -m app.partitioning enable|disable. Databases
+partitioned by the old revision stay partitioned; run `disable` before
+downgrading past it if the old layout is needed.
+
+"""
+from typing import Sequence, Union
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f7a2e91d38'
+down_revision: Union[str, Sequence[str], None] = 'a6e3d9b08f21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    pass
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
@@ -0,0 +1,40 @@
+"""add-retrying-status
+
+Revision ID: d5b1e8f3a724
+Revises: 9a3f5e71c8d4
+Create Date: 2026-10-18 10:12:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b1e8f3a724'
+down_revision: Union[str, Sequence[str], None] = '9a3f5e71c8d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+old_status = sa.Enum('PENDING', 'PROCESSING', 'SUCCESS', 'PARTIAL', 'FAILED', name='jobstatus')
+new_status = sa.Enum('PENDING', 'PROCESSING', 'SUCCESS', 'PARTIAL', 'RETRYING', 'FAILED', name='jobstatus')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('upload_jobs', schema=None) as batch_op:
+        batch_op.alter_column('status',
+               existing_type=old_status,
+               type_=new_status,
+               existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE upload_jobs SET status = 'FAILED' WHERE status = 'RETRYING'")
+    with op.batch_alter_table('upload_jobs', schema=None) as batch_op:
+        batch_op.alter_column('status',
+               existing_type=new_status,
+               type_=old_status,
+               existing_nullable=False)
@@ -0,0 +1,95 @@
+"""
+The app reads its settings when first imported, so the test environment
+is set here, before any test module imports it: a throwaway SQLite
+database and no broker (imports run on the in-process worker pool).
+"""
+
+import os
+import tempfile
+import time
+
+import pytest
+
+_WORKDIR = tempfile.mkdtemp(prefix="importer-tests-")
+os.environ.update(
+    {
+        "DATABASE_URL_SYNC": f"sqlite:///{_WORKDIR}/test.db",
+        "DATABASE_URL_ASYNC": f"sqlite+aiosqlite:///{_WORKDIR}/test.db",
+        "DATABASE_URL_READ": "",
+        "CELERY_BROKER_URL": "memory://",
+        "CELERY_RESULT_BACKEND": "cache+memory://",
+        "SECRET_KEY": "test-secret",
+        "ENCODE_ALGORITHM": "HS256",
+        "ACCESS_TOKEN_LIFE_MINUIT": "30",
+        "BCRYPT_ROUNDS": "4",
+    }
+)
+
+FINISHED = ("SUCCESS", "PARTIAL", "FAILED")
+
+
+@pytest.fixture
+def db():
+    """A sync session on freshly created tables."""
+    from app.auth import token_cache
+    from app.database import Base, SyncSessionLocal, sync_engine
+    from app.mapping import _converters
+
+    # Process-wide caches keyed by ids the previous test's rows used
+    token_cache.clear()
+    _converters.clear()
+    Base.metadata.drop_all(sync_engine)
+    Base.metadata.create_all(sync_engine)
+    session = SyncSessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db, tmp_path, monkeypatch):
+    """The API on the test database, storing uploads under tmp_path."""
+    from fastapi.testclient import TestClient
+
+    import app.main
+    from app.main import app as api
+
+    monkeypatch.setattr(app.main, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(
+        app.main, "UPLOAD_SESSION_DIR", str(tmp_path / "uploads" / "sessions")
+    )
+    with TestClient(api) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def register(client):
+    """register(email) -> auth headers of a new user."""
+
+    def register(email: str = "user@example.com") -> dict:
+        response = client.post(
+            "/auth/register",
+            json={
+                "email": email,
+                "username": email.split("@")[0],
+                "password": "Passw0rdX",
+            },
+        )
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return register
+
+
+@pytest.fixture
+def wait_for_job(client):
+    """wait_for_job(job_id, headers) -> the job once it has finished."""
+
+    def wait_for_job(job_id: int, headers: dict, timeout: float = 10) -> dict:
+        deadline = time.monotonic() + timeout
+        while True:
+            job = client.get(f"/jobs/{job_id}", headers=headers).json()
+            if job["status"] in FINISHED or time.monotonic() > deadline:
+                return job
+            time.sleep(0.05)
+
+    return wait_for_job
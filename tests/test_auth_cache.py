@@ -0,0 +1,37 @@
+from sqlalchemy import select
+
+from app.auth import token_cache
+from app.models import User
+
+
+def cached_token(client, headers) -> str:
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    token = headers["Authorization"].split()[1]
+    assert token_cache.get(token) is not None
+    return token
+
+
+def test_deactivating_a_user_evicts_their_tokens(client, register, db):
+    headers = register("gone@example.com")
+    token = cached_token(client, headers)
+
+    user = db.scalar(select(User).where(User.email == "gone@example.com"))
+    user.is_active = False
+    db.commit()
+
+    assert token_cache.get(token) is None
+    assert client.get("/auth/me", headers=headers).status_code == 404
+
+
+def test_deleting_a_user_evicts_their_tokens(client, register, db):
+    headers = register("gone@example.com")
+    other = register("stays@example.com")
+    token = cached_token(client, headers)
+    other_token = cached_token(client, other)
+
+    db.delete(db.scalar(select(User).where(User.email == "gone@example.com")))
+    db.commit()
+
+    assert token_cache.get(token) is None
+    assert token_cache.get(other_token) is not None
+    assert client.get("/auth/me", headers=headers).status_code == 401
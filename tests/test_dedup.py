@@ -0,0 +1,64 @@
+from sqlalchemy import update
+
+from app.models import JobStatus, UploadCSV
+
+BODY = ("name,role,location,extra_info\n" + "n,r,l,e\n" * 20).encode()
+COLUMNS = [{"source": "name", "target": "name"}]
+
+
+def upload(client, headers, **fields):
+    return client.post(
+        "/upload",
+        files={"file": ("people.csv", BODY, "text/csv")},
+        data=fields,
+        headers=headers,
+    )
+
+
+def imported(client, headers, wait_for_job, **fields) -> int:
+    response = upload(client, headers, **fields)
+    assert response.status_code == 202, response.text
+    assert response.json()["deduplicated"] is False
+    job_id = response.json()["job_id"]
+    assert wait_for_job(job_id, headers)["status"] == "SUCCESS"
+    return job_id
+
+
+def test_reupload_returns_the_finished_job(client, register, wait_for_job):
+    headers = register()
+    job_id = imported(client, headers, wait_for_job)
+
+    again = upload(client, headers)
+    assert again.status_code == 200
+    assert again.json()["deduplicated"] is True
+    assert again.json()["job_id"] == job_id
+
+
+def test_schema_change_imports_again(client, register, wait_for_job):
+    headers = register()
+    schema = client.post(
+        "/schemas", json={"name": "people", "columns": COLUMNS}, headers=headers
+    ).json()
+    first = imported(client, headers, wait_for_job, schema_id=str(schema["id"]))
+    # without the schema it is another import
+    imported(client, headers, wait_for_job)
+
+    columns = COLUMNS + [{"source": "role", "target": "role"}]
+    client.put(
+        f"/schemas/{schema['id']}",
+        json={"name": "people", "columns": columns},
+        headers=headers,
+    ).raise_for_status()
+    second = imported(client, headers, wait_for_job, schema_id=str(schema["id"]))
+    assert second != first
+
+
+def test_failed_job_is_not_reused(client, register, wait_for_job, db):
+    headers = register()
+    job_id = imported(client, headers, wait_for_job)
+    db.execute(
+        update(UploadCSV).where(UploadCSV.id == job_id).values(status=JobStatus.FAILED)
+    )
+    db.commit()
+
+    assert imported(client, headers, wait_for_job) != job_id
@@ -0,0 +1,58 @@
+import pytest
+
+from app.utils import ArrowCSVParser, CSVReader, MalformedRow, StdlibCSVParser
+
+pytest.importorskip("pyarrow")
+
+COLUMNS = ("name", "role", "location", "extra_info")
+
+ROWS = [
+    " padded ,\trole\t,loc,extra",
+    "short,row",
+    "long,row,with,two,extra",
+    '"quoted, comma","say ""hi""",loc,"multi\nline"',
+    '"short\nquoted",row',
+    "",
+    "   ",
+    "empty,,,",
+    'unicode é,"日本, 語",　wide　,x',
+]
+
+
+def read(path, parser, **kwargs):
+    rows = list(CSVReader(str(path), COLUMNS, parser=parser, **kwargs))
+    return [
+        (type(row), tuple(row), getattr(row, "field_count", None)) for row in rows
+    ]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "rows.csv"
+    lines = ["name,role,location,extra_info"]
+    for i in range(300):
+        lines.extend(row.replace("row", f"row{i}") for row in ROWS)
+    lines.append("trailing,short")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("block_size", [512, 4096, 1 << 20])
+def test_backends_yield_the_same_rows(csv_path, block_size):
+    expected = read(csv_path, StdlibCSVParser())
+    assert read(csv_path, ArrowCSVParser(block_size=block_size)) == expected
+
+    malformed = [row for row in expected if row[0] is MalformedRow]
+    assert {row[2] for row in malformed} == {1, 2, 5}
+    # Short rows are padded, long rows cut to the header's columns
+    assert (MalformedRow, ("short", "row0", None, None), 2) in expected
+    assert (MalformedRow, ("long", "row0", "with", "two"), 5) in expected
+
+
+def test_backends_resume_alike(csv_path):
+    with open(csv_path, "rb") as fp:
+        checkpoint = fp.read().index(b"short,row150\n")
+
+    stdlib = read(csv_path, StdlibCSVParser(), start_offset=checkpoint)
+    assert stdlib[0] == (MalformedRow, ("short", "row150", None, None), 2)
+    assert read(csv_path, ArrowCSVParser(), start_offset=checkpoint) == stdlib
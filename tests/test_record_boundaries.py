@@ -0,0 +1,75 @@
+import csv
+import io
+
+import pytest
+
+from app.utils import find_record_boundaries
+
+
+def write_rows(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as fp:
+        fp.write("name,role,location,extra_info\r\n")
+        for row in rows:
+            fp.write(row)
+
+
+def parse(data: bytes):
+    return list(csv.reader(io.StringIO(data.decode("utf-8"), newline="")))
+
+
+def sequential(path):
+    with open(path, "rb") as fp:
+        return parse(fp.read())[1:]
+
+
+def parse_ranges(path, chunk_bytes, start=0):
+    with open(path, "rb") as fp:
+        data = fp.read()
+    data_start, ranges = find_record_boundaries(str(path), chunk_bytes, start=start)
+    assert ranges[0][0] == data_start
+    return [row for begin, end in ranges for row in parse(data[begin:end])]
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 37, 256])
+def test_stray_quote_in_unquoted_field(tmp_path, chunk_bytes):
+    # csv.reader keeps the quote in 5'10" as text; counting quotes would
+    # flip the quoted state for the rest of the file
+    rows = ['a,5\'10",x,y\n']
+    for i in range(2000):
+        if i % 7 == 0:
+            rows.append(f'n{i},r,"line1\nline2 {i}""",e\n')
+        else:
+            rows.append(f"n{i},r,l,e\n")
+    path = tmp_path / "stray.csv"
+    write_rows(path, rows)
+
+    expected = sequential(path)
+    assert len(expected) == 2001
+    assert parse_ranges(path, chunk_bytes) == expected
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 5, 40])
+def test_quoted_fields(tmp_path, chunk_bytes):
+    rows = [
+        '"a,b","say ""hi""\n",x,y\r\n',
+        '"""",,"\n\n",z\n',
+        'p,"q"r"s,t\n',  # text after a closing quote, then a literal quote
+        'x""y,1,2,"3"\r',
+        'lone,"\r",cr,end\n',
+    ] * 50
+    path = tmp_path / "quoted.csv"
+    write_rows(path, rows + ["no,trailing,new,line"])
+
+    assert parse_ranges(path, chunk_bytes) == sequential(path)
+
+
+def test_start_at_checkpoint(tmp_path):
+    rows = [f'n{i},"multi\nline",x,y\n' for i in range(100)]
+    path = tmp_path / "resume.csv"
+    write_rows(path, rows)
+    with open(path, "rb") as fp:
+        checkpoint = fp.read().index(b"n50,")
+
+    data_start, _ = find_record_boundaries(str(path), 100, start=checkpoint)
+    assert data_start == checkpoint
+    assert parse_ranges(path, 100, start=checkpoint) == sequential(path)[50:]
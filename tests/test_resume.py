@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import select
+
+import app.tasks
+import app.utils
+from app.bulk import BulkInserter
+from app.models import CSVData, JobStatus, UploadCSV, User
+from app.tasks import import_csv
+from app.utils import ArrowCSVParser, StdlibCSVParser
+
+ROWS = 12_000  # three insert batches of INSERT_BATCH_SIZE=5000
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.fixture
+def job(db, tmp_path):
+    path = tmp_path / "rows.csv"
+    lines = ["name,role,location,extra_info"]
+    for i in range(ROWS):
+        # quoted newlines so ranges and checkpoints must follow quotes
+        role = f'"r{i}\nsecond line"' if i % 7 == 0 else f"r{i}"
+        lines.append(f"n{i},{role},l{i},e{i}")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    user = User(email="resume@example.com", username="resume", hashed_password="x")
+    db.add(user)
+    db.commit()
+    job = UploadCSV(
+        file_path=str(path),
+        original_filename="rows.csv",
+        file_size=path.stat().st_size,
+        user_id=user.id,
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+@pytest.fixture(params=["stdlib", "pyarrow", "parallel"])
+def reader(request, monkeypatch):
+    if request.param == "pyarrow":
+        pytest.importorskip("pyarrow")
+        # small blocks: several Arrow batches per insert batch
+        parser = ArrowCSVParser(block_size=64 * 1024)
+        monkeypatch.setattr(app.utils, "get_csv_parser", lambda: parser)
+    else:
+        monkeypatch.setattr(app.utils, "get_csv_parser", StdlibCSVParser)
+    if request.param == "parallel":
+        monkeypatch.setattr(app.tasks, "PARALLEL_PARSE_MIN_BYTES", 0)
+        monkeypatch.setattr(app.tasks, "PARSE_CHUNK_BYTES", 32 * 1024)
+        monkeypatch.setattr(app.tasks, "PARSE_WORKERS", 2)
+    return request.param
+
+
+def fail_after(monkeypatch, batches: int):
+    """Make the next import crash once `batches` insert batches committed."""
+    insert_batch = BulkInserter.insert_batch
+    calls = 0
+
+    def crashing(self, rows):
+        nonlocal calls
+        calls += 1
+        if calls > batches:
+            raise Crash("worker lost")
+        return insert_batch(self, rows)
+
+    monkeypatch.setattr(BulkInserter, "insert_batch", crashing)
+
+
+def stored_rows(db, job_id):
+    return db.execute(
+        select(CSVData.row_number, CSVData.name)
+        .where(CSVData.job_id == job_id)
+        .order_by(CSVData.row_number)
+    ).all()
+
+
+@pytest.mark.parametrize("batches", [1, 2])
+def test_retry_after_a_crash_imports_every_row_once(db, job, reader, batches):
+    with pytest.MonkeyPatch.context() as patch:
+        fail_after(patch, batches)
+        with pytest.raises(Crash):
+            import_csv(job.id, job.file_path, will_retry=True)
+
+    db.expire_all()
+    failed = db.get(UploadCSV, job.id)
+    committed = batches * 5000
+    assert failed.status == JobStatus.RETRYING
+    assert len(stored_rows(db, job.id)) == committed
+    # never past a committed row; stdlib batches end where inserts commit
+    assert (failed.checkpoint_row or 0) <= committed
+    if reader == "stdlib":
+        assert failed.checkpoint_row == committed
+
+    import_csv(job.id, job.file_path)
+
+    db.expire_all()
+    finished = db.get(UploadCSV, job.id)
+    assert finished.status == JobStatus.SUCCESS
+    assert finished.rows_processed == ROWS
+    assert stored_rows(db, job.id) == [(i + 1, f"n{i}") for i in range(ROWS)]
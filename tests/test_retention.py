@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app import retention
+from app.models import CSVData, CSVReject, JobStatus, UploadCSV, User
+from app.retention import purge_expired_jobs, sweep_orphan_files
+
+NOW = datetime.now(timezone.utc).replace(tzinfo=None)
+OLD = NOW - timedelta(days=40)
+HOUR = 3600
+
+
+@pytest.fixture
+def jobs(db, tmp_path):
+    """status -> job: old ones of every kind, plus a recent SUCCESS."""
+    user = User(email="old@example.com", username="old", hashed_password="x")
+    db.add(user)
+    db.commit()
+
+    def add(status, created_at=OLD, rows=0):
+        path = tmp_path / f"{status.value.lower()}-{created_at:%Y}.csv"
+        if status in (JobStatus.FAILED, JobStatus.PROCESSING, JobStatus.RETRYING):
+            # imports that did not succeed keep their file
+            path.write_text("name\nx\n")
+        job = UploadCSV(
+            file_path=str(path),
+            original_filename=path.name,
+            status=status,
+            user_id=user.id,
+            rows_processed=rows,
+            created_at=created_at,
+        )
+        db.add(job)
+        db.flush()
+        db.add_all(
+            CSVData(job_id=job.id, row_number=i + 1, name="x") for i in range(rows)
+        )
+        db.add(CSVReject(job_id=job.id, row_number=rows + 1, reason="test"))
+        return job
+
+    created = {
+        "success": add(JobStatus.SUCCESS, rows=3),
+        "failed": add(JobStatus.FAILED, rows=1),
+        "processing": add(JobStatus.PROCESSING, rows=2),
+        "retrying": add(JobStatus.RETRYING),
+        "pending": add(JobStatus.PENDING),
+        "recent": add(JobStatus.SUCCESS, created_at=NOW, rows=1),
+    }
+    db.commit()
+    return created
+
+
+def remaining(db):
+    return {
+        "jobs": set(db.scalars(select(UploadCSV.id))),
+        "rows": db.scalar(select(func.count(CSVData.id))),
+        "rejects": db.scalar(select(func.count(CSVReject.id))),
+    }
+
+
+def test_only_expired_finished_jobs_are_purged(db, jobs):
+    report = purge_expired_jobs(db, timedelta(days=30))
+
+    # rows and rejects of the SUCCESS and FAILED jobs
+    assert (report.jobs, report.rows, report.files) == (2, (3 + 1) + (1 + 1), 1)
+    kept = ("processing", "retrying", "pending", "recent")
+    assert remaining(db) == {
+        "jobs": {jobs[name].id for name in kept},
+        "rows": 2 + 1,
+        "rejects": len(kept),
+    }
+    assert not os.path.exists(jobs["failed"].file_path)
+    assert os.path.exists(jobs["processing"].file_path)
+    assert os.path.exists(jobs["retrying"].file_path)
+
+
+def test_dry_run_reports_without_deleting(db, jobs):
+    before = remaining(db)
+
+    report = purge_expired_jobs(db, timedelta(days=30), dry_run=True)
+
+    # a dry run counts rows_processed
+    assert (report.jobs, report.rows, report.files) == (2, 3 + 1, 1)
+    assert remaining(db) == before
+    assert os.path.exists(jobs["failed"].file_path)
+
+
+def test_cli_dry_run(db, jobs, monkeypatch, capsys):
+    before = remaining(db)
+    monkeypatch.setattr(sys, "argv", ["retention", "--days", "30", "--dry-run"])
+
+    retention.main()
+
+    assert json.loads(capsys.readouterr().out)["jobs"] == 2
+    assert remaining(db) == before
+
+
+def test_orphan_sweep_keeps_files_of_every_job(db, jobs, tmp_path):
+    orphan = tmp_path / "orphan.csv"
+    fresh = tmp_path / "still-uploading.csv"
+    for path in (orphan, fresh):
+        path.write_text("name\nx\n")
+    old = time.time() - 2 * HOUR
+    for path in tmp_path.iterdir():
+        if path != fresh:
+            os.utime(path, (old, old))
+
+    dry = sweep_orphan_files(db, upload_dir=str(tmp_path), min_age=HOUR, dry_run=True)
+    assert dry.files == 1
+    assert orphan.exists()
+
+    report = sweep_orphan_files(db, upload_dir=str(tmp_path), min_age=HOUR)
+    assert report.files == 1
+    assert not orphan.exists()
+    assert fresh.exists()
+    # a failed job's file waits for the job to expire (a retry may read it)
+    for name in ("failed", "processing", "retrying"):
+        assert os.path.exists(jobs[name].file_path)
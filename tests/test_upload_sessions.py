@@ -0,0 +1,160 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.models import UploadSession
+
+DATA = ("name,role,location,extra_info\n" + "n,r,l,e\n" * 500).encode()
+
+
+def start_upload(client, headers, **fields) -> str:
+    response = client.post(
+        "/uploads",
+        json={"filename": "big.csv", "size": len(DATA), **fields},
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def patch(client, headers, upload_id, offset, body):
+    return client.patch(
+        f"/uploads/{upload_id}",
+        content=body,
+        headers={**headers, "Upload-Offset": str(offset)},
+    )
+
+
+def patch_in_chunks(client, headers, upload_id, offset, chunks, length=None) -> int:
+    """
+    PATCH with each chunk in its own ASGI message (TestClient sends the
+    body as one) and return the status code.
+    """
+    headers = {**headers, "Upload-Offset": str(offset)}
+    if length is not None:
+        headers["Content-Length"] = str(length)
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks
+    ]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+    status = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    path = f"/uploads/{upload_id}"
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "PATCH",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    client.portal.call(client.app, scope, receive, send)
+    return status[0]
+
+
+def stored_offset(client, headers, upload_id) -> int:
+    response = client.head(f"/uploads/{upload_id}", headers=headers)
+    return int(response.headers["Upload-Offset"])
+
+
+def set_lock(db, upload_id, locked_until):
+    db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload_id)
+        .values(lock_token="other-request", locked_until=locked_until)
+    )
+    db.commit()
+
+
+def test_chunk_past_the_size_writes_nothing(client, register):
+    headers = register()
+    upload_id = start_upload(client, headers)
+    assert patch(client, headers, upload_id, 0, DATA[:100]).status_code == 204
+
+    chunks = [DATA[100:], b"extra"]
+    # refused on Content-Length, before the body is read
+    length = len(DATA) - 100 + len(b"extra")
+    assert patch_in_chunks(client, headers, upload_id, 100, chunks, length) == 413
+    # chunked: refused once it overruns, the first chunk is not kept
+    assert patch_in_chunks(client, headers, upload_id, 100, chunks) == 413
+
+    assert stored_offset(client, headers, upload_id) == 100
+    assert patch(client, headers, upload_id, 100, DATA[100:]).status_code == 204
+
+
+def test_locked_upload_refuses_writes_until_the_lease_runs_out(client, register, db):
+    headers = register()
+    upload_id = start_upload(client, headers)
+    assert patch(client, headers, upload_id, 0, DATA[:100]).status_code == 204
+
+    set_lock(db, upload_id, datetime(2100, 1, 1))
+    busy = patch(client, headers, upload_id, 100, DATA[100:])
+    assert busy.status_code == 409
+    assert busy.headers["Upload-Offset"] == "100"
+    assert client.delete(f"/uploads/{upload_id}", headers=headers).status_code == 409
+    assert stored_offset(client, headers, upload_id) == 100
+
+    # the holder died: its lease expired
+    set_lock(db, upload_id, datetime(2000, 1, 1))
+    assert patch(client, headers, upload_id, 100, DATA[100:]).status_code == 204
+    # a retry of a PATCH that already landed
+    assert patch(client, headers, upload_id, 100, DATA[100:]).status_code == 409
+
+
+def test_concurrent_finalizes_create_one_job(client, register, wait_for_job):
+    headers = register()
+    upload_id = start_upload(client, headers)
+    finalize = f"/uploads/{upload_id}/finalize"
+    assert client.post(finalize, headers=headers).status_code == 409
+    assert patch(client, headers, upload_id, 0, DATA).status_code == 204
+
+    with ThreadPoolExecutor(4) as pool:
+        responses = list(
+            pool.map(lambda _: client.post(finalize, headers=headers), range(4))
+        )
+    job_ids = {r.json()["job_id"] for r in responses if r.status_code in (200, 202)}
+    assert len(job_ids) == 1
+    assert [r.status_code for r in responses].count(202) == 1
+    assert all(r.status_code in (200, 202, 409) for r in responses)
+
+    (job_id,) = job_ids
+    again = client.post(finalize, headers=headers)
+    assert again.status_code == 200
+    assert again.json()["job_id"] == job_id
+    assert wait_for_job(job_id, headers)["status"] == "SUCCESS"
+    assert patch(client, headers, upload_id, len(DATA), b"x").status_code == 409
+
+
+def test_schema_of_an_open_upload_cannot_be_deleted(
+    client, register, wait_for_job, db
+):
+    headers = register()
+    schema = client.post(
+        "/schemas",
+        json={"name": "people", "columns": [{"source": "name", "target": "name"}]},
+        headers=headers,
+    ).json()
+    upload_id = start_upload(client, headers, schema_id=schema["id"])
+    assert client.delete(f"/schemas/{schema['id']}", headers=headers).status_code == 409
+
+    assert patch(client, headers, upload_id, 0, DATA).status_code == 204
+    finalized = client.post(f"/uploads/{upload_id}/finalize", headers=headers)
+    assert finalized.status_code == 202
+    wait_for_job(finalized.json()["job_id"], headers)
+    # the finalized session keeps the job, not the schema
+    assert client.delete(f"/schemas/{schema['id']}", headers=headers).status_code == 204
+    assert db.get(UploadSession, upload_id).schema_id is None